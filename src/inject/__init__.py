@@ -136,10 +136,12 @@ You can find this file in I{examples/simple.py}::
 __version__ = '2.0-beta'
 
 
-from inject import exc
+from inject import exc, forks
 from inject.injections import attr, named_attr, class_attr, param, \
     super_param as super
 from inject.imports import lazy
+from inject.caching import request_cached, thread_cached
+from inject.failures import Backoff
 from inject.injectors import Injector, get_injector, get_instance, \
-    create, create_lazy, register, unregister, is_registered
-from inject.scopes import appscope, noscope, threadscope, reqscope
+    create, create_lazy, register, unregister, is_registered, use_injector
+from inject.scopes import appscope, noscope, threadscope, reqscope, scoped
@@ -0,0 +1,92 @@
+'''Scope-local memoization of function results.
+L{inject.request_cached <RequestCached>} memoizes a function in the current
+request, and L{inject.thread_cached <ThreadCached>} memoizes it in the current
+thread. The results are cached by the function arguments, which must be
+hashable. A request cache is dropped when the request ends.
+
+Example::
+    
+    @inject.request_cached
+    def get_permissions(user_id):
+        return load_permissions(user_id)
+    
+    with reqscope:
+        get_permissions(10) # Loads the permissions.
+        get_permissions(10) # Returns the cached permissions.
+    
+    get_permissions.cache_info() # {'hits': 1, 'misses': 1}
+
+'''
+from functools import update_wrapper
+
+from inject.injections import InjectionPoint
+from inject.scopes import ThreadScope, RequestScope
+
+
+class ThreadCached(object):
+    
+    '''ThreadCached is a function decorator, which memoizes the function
+    results in the current thread.
+    
+    B{Alias}: C{thread_cached}.
+    
+    The wrapper has a C{cache_info} method, which returns the numbers of
+    cache hits and misses (approximate when called from multiple threads).
+    '''
+    
+    scope_type = ThreadScope
+    
+    def __new__(cls, func):
+        return cls.create_wrapper(func)
+    
+    @classmethod
+    def create_wrapper(cls, func):
+        injection = InjectionPoint(cls.scope_type)
+        counters = [0, 0]
+        
+        def cached_wrapper(*args, **kwargs):
+            '''Cached wrapper returns a result from the scope cache,
+            or calls the wrapped function and caches its result.
+            '''
+            cache = injection.get_instance().get_cache(cached_wrapper)
+            if kwargs:
+                key = (args, frozenset(kwargs.iteritems()))
+            else:
+                key = args
+            
+            if key in cache:
+                counters[0] += 1
+                return cache[key]
+            
+            counters[1] += 1
+            result = func(*args, **kwargs)
+            cache[key] = result
+            return result
+        
+        def cache_info():
+            '''Return a dict with the numbers of cache hits and misses.'''
+            return {'hits': counters[0], 'misses': counters[1]}
+        
+        cached_wrapper.func = func
+        cached_wrapper.cache_info = cache_info
+        update_wrapper(cached_wrapper, func)
+        
+        return cached_wrapper
+
+
+class RequestCached(ThreadCached):
+    
+    '''RequestCached is a function decorator, which memoizes the function
+    results in the current request.
+    
+    B{Alias}: C{request_cached}.
+    
+    @raise NoRequestError: when the wrapper is called, and no request
+        has been started.
+    '''
+    
+    scope_type = RequestScope
+
+
+thread_cached = ThreadCached
+request_cached = RequestCached
@@ -0,0 +1,327 @@
+'''Declarative bindings and their hot reloading.
+Bindings can be declared in a JSON file as a list of entries, each with
+a key and a value or a dotted factory path, which is imported lazily with
+L{lazy_import <inject.imports.lazy_import>} when the factory is called::
+    
+    {"bindings": [
+        {"key": "api.timeout", "value": 5},
+        {"key": "api.endpoint", "value": "http://api.local"},
+        {"type": "myapp.backends.Backend",
+         "factory": "myapp.backends.RedisBackend",
+         "kwargs": {"url": "redis://localhost"}}
+    ]}
+
+An entry key is either a C{key} (any JSON value) or a C{type} (a dotted path
+of an imported class).
+
+Manifest entries
+----------------
+
+A manifest entry declares a dotted C{target} path instead of a value or
+a factory, so that its module is imported on the first L{Injector.get
+<inject.injectors.Injector.get>}, not when the bindings are configured.
+Process boot then imports only the services which are used::
+    
+    [
+        {"type": "myapp.interfaces.Mailer", "target": "myapp.smtp.SmtpMailer",
+         "factory": true},
+        {"type": "myapp.models.Session", "target": "myapp.db.create_session",
+         "factory": true, "scope": "request"},
+        {"key": "templates", "target": "myapp.templates.REGISTRY"}
+    ]
+
+With a true C{factory} flag the target is called to create an instance,
+otherwise the target itself is bound. In a manifest entry C{factory} must be
+a boolean, not a factory path. The optional C{scope} (C{app},
+C{noscope}, C{thread} or C{request}, the default is C{app}) must be bound
+in the configured injector. The keys of C{type} entries are imported when
+configured, they are usually interfaces in lightweight modules.
+
+L{ConfigReloader} builds a snapshot (a L{child <inject.injectors.ChildInjector>}
+of the application injector) from the file, and rebuilds it when the file
+changes (polled by its modification time) or on a signal. A new snapshot is
+built and warmed up in a background thread, and then swapped in atomically.
+If the file is invalid, the current snapshot is kept and the error is logged.
+Requests use a snapshot with L{ConfigReloader.pin}, so that in-flight
+requests keep the snapshot they have started with. A replaced snapshot is
+disposed (see L{Injector.dispose <inject.injectors.Injector.dispose>}) when
+the last request which has pinned it ends.
+
+Example::
+    
+    reloader = ConfigReloader(injector, 'bindings.json', interval=5)
+    reloader.load()
+    reloader.start()
+    
+    def app(environ, start_response):
+        with reloader.pin():
+            return handle(environ, start_response)
+
+'''
+import json
+import logging
+import os
+import signal
+import threading
+from contextlib import contextmanager
+
+from inject.imports import lazy_import
+from inject.injectors import use_injector
+from inject.scopes import ApplicationScope, NoScope, ThreadScope, RequestScope
+
+
+logger = logging.getLogger('inject.config')
+
+
+'''
+@var SCOPES: Scope types by manifest names.
+'''
+SCOPES = {'app': ApplicationScope, 'noscope': NoScope, 'thread': ThreadScope,
+          'request': RequestScope}
+
+
+def load(path):
+    '''Return a list of binding entries from a JSON file, which contains
+    a list or a dict with a C{bindings} list.
+    '''
+    f = open(path)
+    try:
+        data = json.load(f)
+    finally:
+        f.close()
+    
+    if isinstance(data, dict):
+        data = data['bindings']
+    return data
+
+
+def get_key(entry):
+    '''Return a binding key of an entry, import it if it is a C{type}.'''
+    if 'type' in entry:
+        return lazy_import(entry['type'], None)()
+    return entry['key']
+
+
+def create_factory(path, args=(), kwargs=None):
+    '''Return a factory which imports a callable by its dotted path, and
+    calls it with the args and kwargs.
+    '''
+    imp = lazy_import(path, None)
+    kwargs = dict((str(k), v) for k, v in (kwargs or {}).iteritems())
+    
+    def factory():
+        return imp()(*args, **kwargs)
+    
+    factory.path = path
+    return factory
+
+
+def create_target_factory(path, call=False):
+    '''Return a factory which imports a target by its dotted path, and
+    returns it, or calls it when call is true.
+    '''
+    if call:
+        return create_factory(path)
+    
+    imp = lazy_import(path, None)
+    
+    def factory():
+        return imp()
+    
+    factory.path = path
+    return factory
+
+
+def configure(injector, entries):
+    '''Bind entries in an injector.
+    
+    @raise ValueError: if an entry does not have a value, a factory,
+        or a target, or a manifest entry has a non-boolean factory flag,
+        or its scope is not bound in the injector.
+    '''
+    for entry in entries:
+        key = get_key(entry)
+        if 'target' in entry:
+            _bind_target(injector, key, entry)
+        elif 'value' in entry:
+            injector.bind(key, entry['value'])
+        elif 'factory' in entry:
+            factory = create_factory(entry['factory'], entry.get('args', ()),
+                                     entry.get('kwargs'))
+            injector.bind_factory(key, factory)
+        else:
+            raise ValueError('Binding entry %r has no value or factory.'
+                             % entry)
+
+
+def _bind_target(injector, key, entry):
+    '''Bind a lazily imported target of a manifest entry.'''
+    call = entry.get('factory', False)
+    if not isinstance(call, bool):
+        raise ValueError('Manifest entry %r must have a boolean factory '
+                         'flag, not a factory path.' % entry)
+    
+    factory = create_target_factory(entry['target'], call=call)
+    
+    scope_type = SCOPES.get(entry.get('scope', 'app'))
+    if scope_type is None or not injector.is_scope_bound(scope_type):
+        raise ValueError('Binding entry %r has an unknown scope.' % entry)
+    
+    injector.bind_factory(key, factory, scope=scope_type)
+
+
+class ConfigReloader(object):
+    
+    '''ConfigReloader maintains a snapshot of bindings from a file,
+    see the module documentation.
+    
+    @ivar current: The current snapshot, a child injector, or None.
+    @ivar version: The number of the loaded snapshots.
+    '''
+    
+    logger = logging.getLogger('inject.ConfigReloader')
+    
+    def __init__(self, injector, path, interval=None):
+        '''Create a new reloader.
+        
+        @param injector: The parent injector of snapshots.
+        @param path: The bindings file path.
+        @param interval: The file polling interval in seconds for L{start}.
+        '''
+        self.injector = injector
+        self.path = path
+        self.interval = interval
+        self.current = None
+        self.version = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._pinned = {}
+        self._pins_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def build(self):
+        '''Return a new warmed up snapshot from the file. It is configured
+        and warmed up as the current injector, so that factories resolve
+        their injections from the snapshot.
+        '''
+        snapshot = self.injector.child()
+        with use_injector(snapshot):
+            configure(snapshot, load(self.path))
+            snapshot.warmup()
+        return snapshot
+    
+    def load(self):
+        '''Build a new snapshot and swap it in, return it. The previous
+        snapshot is disposed when it is not pinned.
+        '''
+        with self._lock:
+            mtime = self._get_mtime()
+            snapshot = self.build()
+            
+            self.version += 1
+            snapshot.config_version = self.version
+            with self._pins_lock:
+                previous = self.current
+                self.current = snapshot
+                if previous in self._pinned:
+                    previous = None
+            self._mtime = mtime
+        
+        self.logger.info('Loaded bindings version %s from %s.', self.version,
+                         self.path)
+        if previous is not None:
+            self._dispose(previous)
+        return snapshot
+    
+    def reload(self):
+        '''Load a new snapshot, log an error and keep the current one
+        if it fails. Return true on success.
+        '''
+        try:
+            self.load()
+        except Exception:
+            self.logger.exception('Failed to reload bindings from %s.',
+                                  self.path)
+            return False
+        return True
+    
+    def check(self):
+        '''Reload the snapshot if the file has been modified, return true
+        if it has been reloaded.
+        '''
+        if self._get_mtime() == self._mtime:
+            return False
+        return self.reload()
+    
+    def start(self):
+        '''Start a daemon thread which checks the file every interval
+        seconds.
+        '''
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='inject-config-reloader')
+        self._thread.setDaemon(True)
+        self._thread.start()
+    
+    def stop(self):
+        '''Stop the polling thread.'''
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def install_signal(self, signum=signal.SIGHUP):
+        '''Reload the snapshot in a background thread on a signal.
+        It must be called in the main thread.
+        '''
+        def handler(signum, frame):
+            thread = threading.Thread(target=self.reload,
+                                      name='inject-config-reload')
+            thread.setDaemon(True)
+            thread.start()
+        
+        signal.signal(signum, handler)
+    
+    @contextmanager
+    def pin(self):
+        '''Context manager which makes the current snapshot the current
+        injector in this thread, see L{use_injector
+        <inject.injectors.use_injector>}, and yields it.
+        '''
+        pinned = self._pinned
+        with self._pins_lock:
+            snapshot = self.current
+            pinned[snapshot] = pinned.get(snapshot, 0) + 1
+        
+        try:
+            with use_injector(snapshot):
+                yield snapshot
+        finally:
+            with self._pins_lock:
+                count = pinned[snapshot] - 1
+                if count:
+                    pinned[snapshot] = count
+                else:
+                    del pinned[snapshot]
+                retired = not count and snapshot is not self.current
+            
+            if retired and snapshot is not None:
+                self._dispose(snapshot)
+    
+    def _dispose(self, snapshot):
+        snapshot.dispose()
+        self.logger.info('Disposed bindings version %s.',
+                         snapshot.config_version)
+    
+    def _get_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+    
+    def _run(self):
+        while not self._stopped.isSet():
+            self._stopped.wait(self.interval)
+            if not self._stopped.isSet():
+                self.check()
@@ -0,0 +1,92 @@
+'''Disposal of objects which are owned by scopes.
+
+An object is disposed by calling its C{close} method. Objects without it
+are simply dropped, C{__exit__} is never called, because the objects have
+not been entered by their scopes. Disposal errors are logged and never
+propagate to the caller.
+
+L{Reaper} disposes objects in a background daemon thread, so that slow
+destructors and C{close} calls do not run inside a request.
+
+Example::
+    
+    scope = injector.get(RequestScope)
+    scope.reaper = Reaper()
+
+'''
+import logging
+import threading
+from Queue import Queue
+
+
+logger = logging.getLogger('inject.disposal')
+
+
+def dispose(obj):
+    '''Call C{close} of an object if present, log errors.'''
+    try:
+        close = getattr(obj, 'close', None)
+        if callable(close):
+            close()
+    except Exception:
+        logger.exception('Failed to dispose %r.', obj)
+
+
+def dispose_all(objs):
+    '''Dispose objects in the reversed order, so that objects which have been
+    created later (and can depend on the earlier ones) are disposed first.
+    '''
+    for obj in reversed(objs):
+        dispose(obj)
+
+
+class Reaper(object):
+    
+    '''Reaper disposes objects in a background daemon thread.
+    
+    The thread is started on the first L{put}.
+    '''
+    
+    logger = logging.getLogger('inject.Reaper')
+    
+    def __init__(self):
+        self._queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def put(self, objs):
+        '''Schedule a list of objects for disposal.'''
+        if self._thread is None:
+            self._start()
+        
+        self._queue.put(objs)
+    
+    def join(self):
+        '''Block until all scheduled objects have been disposed.'''
+        self._queue.join()
+    
+    def after_fork(self):
+        '''Drop the parent's thread and queue in a forked child process.'''
+        self._queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            
+            thread = threading.Thread(target=self._run, name='inject-reaper')
+            thread.setDaemon(True)
+            thread.start()
+            self._thread = thread
+            self.logger.info('Started %r.', thread)
+    
+    def _run(self):
+        queue = self._queue
+        while True:
+            objs = queue.get()
+            try:
+                dispose_all(objs)
+            finally:
+                queue.task_done()
@@ -42,15 +42,62 @@ class FactoryNotCallable(Exception):
         super(FactoryNotCallable, self).__init__(msg) 
 
 
+class FactoryTimeout(Exception):
+    
+    '''Factory has not returned within its timeout, see L{bind_factory
+    <inject.scopes.AbstractScope.bind_factory>}.'''
+    
+    def __init__(self, type, timeout):
+        self.timeout = timeout
+        msg = 'Factory for %r has not returned within %ss.' % (type, timeout)
+        super(FactoryTimeout, self).__init__(msg)
+
+
 class AutobindingFailed(Exception):
     
-    '''Injector has failed to autobind a type.''' 
+    '''Injector has failed to autobind a type.
+    
+    @ivar caused_by: The error raised by the type.
+    '''
     
     def __init__(self, type, caused_by):
+        self.caused_by = caused_by
         msg = u'Autobinding of %r failed because of %r' % (type, caused_by)
         return super(AutobindingFailed, self).__init__(msg)
 
 
+class BackoffError(Exception):
+    
+    '''A type has failed to be constructed recently, and is not constructed
+    again during its backoff delay, see L{inject.failures}.
+    
+    @ivar error: The last construction error.
+    @ivar delay: The remaining delay in seconds.
+    '''
+    
+    def __init__(self, type, error, delay):
+        self.error = error
+        self.delay = delay
+        msg = 'Construction of %r failed because of %r, retry in %.1fs.' % (
+            type, error, delay)
+        super(BackoffError, self).__init__(msg)
+
+
+class VerificationFailed(Exception):
+    
+    '''Injection points cannot be resolved, see L{Injector.verify
+    <inject.injectors.Injector.verify>}.
+    
+    @ivar errors: A list of (injection point, error) tuples.
+    '''
+    
+    def __init__(self, errors):
+        self.errors = errors
+        msg = 'Failed to resolve %s injection points: ' % len(errors)
+        msg += ', '.join('%r (%s)' % (point, e) for point, e in errors)
+        super(VerificationFailed, self).__init__(msg)
+
+
 class NoRequestError(Exception):
     
     '''No request has been started.'''
@@ -0,0 +1,61 @@
+'''Executors which propagate the current request into worker threads.
+
+By default, worker threads do not see the request of the thread which
+has submitted a task, so any request-scoped injection in them raises
+L{NoRequestError <inject.exc.NoRequestError>}. L{RequestExecutor} activates
+the submitting thread's request bindings in the worker for the duration
+of each task.
+
+Example::
+    
+    executor = RequestExecutor()
+    
+    @inject.param('user', User)
+    def load_friends(user):
+        return user.friends()
+    
+    with reqscope:
+        reqscope.bind(User, user)
+        future = executor.submit(load_friends)
+        friends = future.result()
+
+'''
+from inject.injectors import get_instance
+from inject.pools import get_shared_pool
+from inject.scopes import RequestScope
+
+
+class RequestExecutor(object):
+    
+    '''RequestExecutor submits tasks to a pool, and runs them in the request
+    of the submitting thread (see L{RequestScope.wrap
+    <inject.scopes.RequestScope.wrap>}).
+    
+    The pool can be any object with the C{submit(func, *args, **kwargs)}
+    method, i.e. L{ThreadPool <inject.pools.ThreadPool>}, or
+    C{concurrent.futures.ThreadPoolExecutor}.
+    '''
+    
+    def __init__(self, pool=None, scope=None):
+        '''Create a new executor.
+        
+        @param pool: A thread pool, the default is the shared pool.
+        @param scope: A request scope, the default is the request scope from
+            the registered injector.
+        '''
+        self.pool = pool
+        self.scope = scope
+    
+    def submit(self, func, *args, **kwargs):
+        '''Submit a task which runs in the current request, return
+        a future.
+        '''
+        scope = self.scope
+        if scope is None:
+            scope = get_instance(RequestScope)
+        
+        pool = self.pool
+        if pool is None:
+            pool = get_shared_pool()
+        
+        return pool.submit(scope.wrap(func), *args, **kwargs)
@@ -0,0 +1,143 @@
+'''Failure cache with backoff of factories and autobinding.
+An injector created with a L{Backoff} policy remembers the failures of
+factories and autobinding for each type. After a failure, the type is not
+constructed again until its backoff delay expires, L{Injector.get
+<inject.injectors.Injector.get>} fails fast with L{BackoffError
+<inject.exc.BackoffError>} instead. It prevents retrying expensive failing
+constructions on every request, i.e. a client whose backend is down.
+
+The delay grows exponentially with consecutive failures, a successful
+construction resets it.
+
+Example::
+    
+    injector = inject.create(backoff=inject.Backoff(initial=1, maximum=30))
+    ...
+    injector.failures.get_failures()
+    # {RedisClient: <Failure 3 ConnectionError(...) retry in 3.2s>}
+
+'''
+import threading
+import time
+
+from inject.exc import BackoffError
+
+
+class Backoff(object):
+    
+    '''Backoff is an exponential backoff policy.
+    
+    With the default C{threshold} of 1 it opens the circuit after the first
+    failure. A higher threshold allows several consecutive failures without
+    a delay, before failing fast.
+    '''
+    
+    def __init__(self, initial=1.0, maximum=60.0, multiplier=2.0, threshold=1):
+        '''Create a new policy.
+        
+        @param initial: The first delay in seconds.
+        @param maximum: The maximum delay in seconds.
+        @param multiplier: The delay multiplier for each next failure.
+        @param threshold: The number of consecutive failures which start
+            the backoff.
+        '''
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.threshold = threshold
+    
+    def get_delay(self, count):
+        '''Return a delay in seconds after a number of consecutive failures.
+        '''
+        if count < self.threshold:
+            return 0.0
+        
+        delay = self.initial * self.multiplier ** (count - self.threshold)
+        return min(delay, self.maximum)
+
+
+class Failure(object):
+    
+    '''Failure stores the consecutive failures of a type.
+    
+    @ivar count: The number of consecutive failures.
+    @ivar error: The last error.
+    @ivar failed_at: The time of the last failure.
+    @ivar retry_at: The time after which the type can be constructed again.
+    '''
+    
+    def __init__(self):
+        self.count = 0
+        self.error = None
+        self.failed_at = None
+        self.retry_at = None
+    
+    def __repr__(self):
+        return '<%s %s %r retry in %.1fs>' % (
+            self.__class__.__name__, self.count, self.error,
+            max(self.retry_at - time.time(), 0.0))
+
+
+class FailureCache(object):
+    
+    '''FailureCache stores the L{Failure}s of types and applies
+    a backoff policy. It is thread-safe.
+    '''
+    
+    def __init__(self, backoff):
+        self.backoff = backoff
+        self._failures = {}
+        self._lock = threading.Lock()
+    
+    def after_fork(self):
+        '''Reset the lock in a forked child process.'''
+        self._lock = threading.Lock()
+    
+    def check(self, type):
+        '''Raise an error if a type is in its backoff delay.
+        
+        @raise BackoffError: if the type is in its backoff delay.
+        '''
+        failure = self._failures.get(type)
+        if failure is None:
+            return
+        
+        delay = failure.retry_at - time.time()
+        if delay > 0:
+            raise BackoffError(type, failure.error, delay)
+    
+    def failed(self, type, error):
+        '''Record a failure of a type.'''
+        with self._lock:
+            failure = self._failures.get(type)
+            if failure is None:
+                failure = self._failures[type] = Failure()
+            
+            failure.count += 1
+            failure.error = error
+            failure.failed_at = time.time()
+            failure.retry_at = failure.failed_at + \
+                self.backoff.get_delay(failure.count)
+    
+    def succeeded(self, type):
+        '''Reset the failures of a type.'''
+        if type in self._failures:
+            with self._lock:
+                self._failures.pop(type, None)
+    
+    def get(self, type):
+        '''Return the L{Failure} of a type or None.'''
+        return self._failures.get(type)
+    
+    def get_failures(self):
+        '''Return a dict of types to their L{Failure}s.'''
+        with self._lock:
+            return dict(self._failures)
+    
+    def clear(self, type=None):
+        '''Reset the failures of a type, or of all types.'''
+        with self._lock:
+            if type is None:
+                self._failures = {}
+            else:
+                self._failures.pop(type, None)
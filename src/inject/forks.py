@@ -0,0 +1,103 @@
+'''Fork support for prefork servers (gunicorn, uWSGI, etc.).
+
+An injector can be configured and warmed up once in a master process, and
+then inherited by forked workers. After a fork, L{after_fork} resets the
+state which must not be shared between processes:
+    
+    - the registration lock and other C{inject} locks,
+    - the thread scope and request scope bindings of the forking thread,
+    - the shared thread pool, the scope reapers and pools,
+    - the application-scoped instances of factories which have been bound
+      with C{per_process=True}, they are lazily recreated in the child.
+    - the garbage collector threshold, which is raised after a prefork
+      warmup on Python versions without C{gc.freeze}.
+
+Use L{Injector.warmup <inject.injectors.Injector.warmup>} with C{prefork=True}
+to create the application singletons in the master, so that the workers share
+their memory pages, and L{memory_usage} to check how much memory stays shared.
+
+On Python 3.7+ L{after_fork} is registered with C{os.register_at_fork}.
+On older versions, call it in a post-fork hook of the server, or call
+L{check_fork}, which compares the process id and is cheap enough to be called
+for every request (the WSGI and Django middleware call it).
+
+Example::
+    
+    # gunicorn.conf.py
+    def post_fork(server, worker):
+        inject.forks.after_fork()
+    
+    # bindings.py
+    injector.bind_factory(Redis, create_redis, per_process=True)
+    injector.warmup(prefork=True)
+
+'''
+import logging
+import os
+import threading
+
+import inject.injectors
+import inject.log
+import inject.pools
+
+
+logger = logging.getLogger('inject.forks')
+_pid = os.getpid()
+
+
+def after_fork():
+    '''Reset the C{inject} state in a forked child process.'''
+    global _pid
+    _pid = os.getpid()
+    
+    inject.injectors._REG_LOCK = threading.RLock()
+    inject.log._lock = threading.Lock()
+    inject.pools.after_fork()
+    
+    injector = inject.injectors._INJECTOR
+    if isinstance(injector, inject.injectors.Injector):
+        injector.after_fork()
+    
+    logger.info('Reset the inject state in a forked process %s.', _pid)
+
+
+def check_fork():
+    '''Call L{after_fork} if the process id has changed since the last
+    check, return true if it has.
+    '''
+    if os.getpid() == _pid:
+        return False
+    
+    after_fork()
+    return True
+
+
+def memory_usage(pid='self'):
+    '''Return a dict with the C{rss}, C{shared} and C{private} memory of
+    a process in bytes, or None if C{/proc/<pid>/smaps} is not available
+    (it is Linux-specific).
+    '''
+    usage = {'rss': 0, 'shared': 0, 'private': 0}
+    fields = {'Rss:': 'rss',
+              'Shared_Clean:': 'shared', 'Shared_Dirty:': 'shared',
+              'Private_Clean:': 'private', 'Private_Dirty:': 'private'}
+    
+    for name in ('smaps_rollup', 'smaps'):
+        try:
+            f = open('/proc/%s/%s' % (pid, name))
+        except IOError:
+            continue
+        
+        try:
+            for line in f:
+                parts = line.split()
+                key = fields.get(parts[0])
+                if key is not None:
+                    usage[key] += int(parts[1]) * 1024
+        finally:
+            f.close()
+        return usage
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=after_fork)
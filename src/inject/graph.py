@@ -0,0 +1,222 @@
+'''Dependency graph of factories and autobound types.
+Dependencies are discovered from injection declarations: L{inject.attr
+<inject.injections.AttributeInjection>}, L{inject.named_attr
+<inject.injections.NamedAttributeInjection>} and L{inject.class_attr
+<inject.injections.ClassAttributeInjection>} in classes (including base
+classes), and L{inject.param <inject.injections.ParamInjection>} in
+functions and constructors.
+
+Example::
+    
+    class A(object): pass
+    class B(object):
+        a = inject.attr(A)
+    
+    get_dependencies(B) # [A]
+
+L{export}, L{to_json} and L{to_dot} export the dependency graph of all
+bindings, factories and their injections in an injector. Each node is
+annotated with the scope, which stores it, and with the resolution and
+construction counters when the injector collects stats (see L{inject.stats}).
+
+Example::
+    
+    injector = inject.create(stats=True)
+    ...
+    open('bindings.dot', 'w').write(to_dot(injector))
+    # $ dot -Tsvg bindings.dot > bindings.svg
+
+'''
+import inspect
+import json
+
+
+def get_dependencies(factory):
+    '''Return a list of types which a factory (a class or a function)
+    declares with injections.
+    '''
+    deps = []
+    if inspect.isclass(factory):
+        for klass in inspect.getmro(factory):
+            for value in klass.__dict__.itervalues():
+                point = getattr(value, 'injection', None)
+                if point is not None and hasattr(point, 'type'):
+                    deps.append(point.type)
+        
+        func = getattr(factory, '__init__', None)
+    else:
+        func = factory
+    
+    if getattr(func, 'injection_wrapper', False):
+        for point in func.injections.itervalues():
+            deps.append(point.type)
+    
+    unique = []
+    for dep in deps:
+        if dep not in unique:
+            unique.append(dep)
+    return unique
+
+
+class DependencyGraph(object):
+    
+    '''DependencyGraph stores the dependencies of each type (a node) on other
+    types. Dependencies which are not nodes are ignored.
+    '''
+    
+    def __init__(self):
+        self.dependencies = {}
+    
+    def __contains__(self, type):
+        return type in self.dependencies
+    
+    def __len__(self):
+        return len(self.dependencies)
+    
+    def add(self, type, dependencies=()):
+        '''Add a node with its dependencies.'''
+        self.dependencies[type] = list(dependencies)
+    
+    def get_dependencies(self, type):
+        '''Return a list of dependencies of a node which are nodes too.'''
+        nodes = self.dependencies
+        return [dep for dep in nodes[type] if dep in nodes and dep != type]
+    
+    def get_dependents(self):
+        '''Return a dict of nodes to lists of nodes which depend on them.'''
+        dependents = {}
+        for type in self.dependencies:
+            for dep in self.get_dependencies(type):
+                dependents.setdefault(dep, []).append(type)
+        return dependents
+    
+    def toposort(self):
+        '''Return a list of nodes where dependencies go before their
+        dependents. Nodes in cycles go last, in any order.
+        '''
+        remaining = {}
+        for type in self.dependencies:
+            remaining[type] = set(self.get_dependencies(type))
+        dependents = self.get_dependents()
+        
+        ordered = [type for type, deps in remaining.iteritems() if not deps]
+        for type in ordered:
+            del remaining[type]
+        
+        i = 0
+        while i < len(ordered):
+            for dependent in dependents.get(ordered[i], ()):
+                deps = remaining.get(dependent)
+                if deps is None:
+                    continue
+                
+                deps.discard(ordered[i])
+                if not deps:
+                    del remaining[dependent]
+                    ordered.append(dependent)
+            i += 1
+        
+        ordered.extend(remaining)
+        return ordered
+
+
+def get_type_name(type):
+    '''Return a dotted name of a class or a function, or repr of
+    other types.
+    '''
+    if inspect.isclass(type) or inspect.isfunction(type):
+        return '%s.%s' % (type.__module__, type.__name__)
+    return repr(type)
+
+
+def export(injector):
+    '''Return a dict with C{nodes} and C{edges} lists of an injector
+    dependency graph.
+    
+    Each node is a dict with the C{id} (a unique type name), C{scope} (a scope
+    class name or None when the type is not stored in any scope),
+    C{resolutions}, C{constructions}, C{construction_time} (in seconds)
+    and C{timeouts} keys. Each edge is a dict with the C{from} and C{to}
+    node ids, where the former depends on the latter.
+    '''
+    nodes = []
+    ids = {}
+    sources = {}
+    
+    def add(type, scope=None, source=None):
+        if type in ids:
+            return
+        
+        id = name = get_type_name(type)
+        i = 1
+        while id in ids.itervalues():
+            i += 1
+            id = '%s#%s' % (name, i)
+        ids[type] = id
+        
+        node = {'id': id, 'scope': scope}
+        node.update(injector.stats.get(type))
+        nodes.append(node)
+        
+        if source is None and inspect.isclass(type):
+            source = type
+        sources[type] = source
+    
+    for scope in injector.get_scopes():
+        name = scope.__class__.__name__
+        factory_types = getattr(scope, 'factory_types', None)
+        bound_types = getattr(scope, 'bound_types', None)
+        if factory_types is None or bound_types is None:
+            continue
+        
+        for type in factory_types():
+            add(type, name, scope.get_factory(type))
+        for type in bound_types():
+            add(type, name)
+    
+    for type in injector.stats.types():
+        add(type)
+    
+    edges = []
+    queue = list(sources)
+    while queue:
+        type = queue.pop()
+        source = sources[type]
+        if source is None:
+            continue
+        
+        for dep in get_dependencies(source):
+            if dep not in ids:
+                add(dep)
+                queue.append(dep)
+            edges.append({'from': ids[type], 'to': ids[dep]})
+    
+    return {'nodes': nodes, 'edges': edges}
+
+
+def to_json(injector, indent=None):
+    '''Return an injector dependency graph as JSON, see L{export}.'''
+    return json.dumps(export(injector), indent=indent, sort_keys=True)
+
+
+def to_dot(injector):
+    '''Return an injector dependency graph in the Graphviz DOT format,
+    see L{export}.
+    '''
+    graph = export(injector)
+    
+    def quote(s):
+        return '"%s"' % s.replace('"', '\\"')
+    
+    lines = ['digraph inject {']
+    for node in graph['nodes']:
+        label = '%s\\n%s\\nresolved %s, constructed %s in %.3f ms' % (
+            node['id'], node['scope'] or 'not bound', node['resolutions'],
+            node['constructions'], node['construction_time'] * 1000)
+        lines.append('    %s [label=%s];' % (quote(node['id']), quote(label)))
+    
+    for edge in graph['edges']:
+        lines.append('    %s -> %s;' % (quote(edge['from']), quote(edge['to'])))
+    
+    lines.append('}')
+    return '\n'.join(lines)
@@ -97,12 +97,29 @@ Example::
     
     my_func()
 
+
+Call-site counters
+==================
+Injection points can count their injections and measure their cumulative
+time, so that hot call sites can be found, i.e. a C{class_attr} which should
+become an C{attr}, or an injection which should be hoisted out of a loop.
+The counters are disabled by default, because they slow down injections.
+
+Example::
+    
+    enable_call_counters()
+    run_benchmark()
+    print format_call_sites(limit=10)
+
 '''
+import inspect
+import time
+import weakref
 from functools import update_wrapper
 
 from inject.exc import NoParamError
 from inject.injectors import get_instance as _get_instance
-from inject.utils import get_attrname_by_value
+from inject.utils import get_attrname_by_value, get_class_key
 
 
 '''
@@ -110,21 +127,132 @@ from inject.utils import get_attrname_by_value
     is injected in a super class.
 '''
 super_param = object()
+_points = weakref.WeakKeyDictionary()
+_counting = False
+_planned_attrs = {}
+
+
+def get_injection_points():
+    '''Return a list of all existing injection points.'''
+    return _points.keys()
+
+
+def enable_call_counters():
+    '''Enable the injection points counters.'''
+    global _counting
+    _counting = True
+
+
+def disable_call_counters():
+    '''Disable the injection points counters, keep the counted values.'''
+    global _counting
+    _counting = False
+
+
+def reset_call_counters():
+    '''Reset the counters of all injection points.'''
+    for point in get_injection_points():
+        point.calls = 0
+        point.time = 0.0
+
+
+def get_call_sites():
+    '''Return a list of dicts with the C{owner} (a class or a function),
+    C{name} (an attribute or a param name), C{type}, C{calls} and C{time}
+    (cumulative, in seconds) of each injection point which has been called,
+    sorted by the time in the descending order.
+    '''
+    sites = []
+    for point in get_injection_points():
+        if not point.calls:
+            continue
+        sites.append({'owner': point.owner, 'name': point.name,
+                      'type': point.type, 'calls': point.calls,
+                      'time': point.time})
+    
+    sites.sort(key=lambda site: site['time'], reverse=True)
+    return sites
+
+
+def format_call_sites(limit=None):
+    '''Return a text report of the call sites, see L{get_call_sites}.'''
+    from inject.graph import get_type_name
+    
+    sites = get_call_sites()
+    if limit is not None:
+        sites = sites[:limit]
+    
+    lines = ['%10s %10s %10s  %s' % ('calls', 'total ms', 'avg us',
+                                     'call site -> type')]
+    for site in sites:
+        owner = site['owner']
+        if owner is not None:
+            owner = get_type_name(owner)
+        
+        lines.append('%10s %10.3f %10.3f  %s.%s -> %s' % (
+            site['calls'], site['time'] * 1000,
+            site['time'] * 1000000 / site['calls'],
+            owner, site['name'], get_type_name(site['type'])))
+    return '\n'.join(lines)
+
+
+def _get_planned_attrname(owner, value):
+    '''Return an attribute name of a value in a class from the loaded plan
+    (see L{inject.plans}), or None if it is not planned or the plan is stale.
+    '''
+    names = _planned_attrs.get(get_class_key(owner))
+    if not names:
+        return
+    
+    for name in names:
+        for klass in inspect.getmro(owner):
+            if name in klass.__dict__:
+                if klass.__dict__[name] is value:
+                    return name
+                break
 
 
 class InjectionPoint(object):
     
-    '''InjectionPoint serves injection requests.'''
+    '''InjectionPoint serves injection requests.
+    
+    All injection points are weakly registered, see L{get_injection_points}.
     
-    __slots__ = ('type', 'none')
+    @ivar owner: A class or a function which owns the point, it is set
+        by the injections, for attributes on the first access.
+    @ivar name: An attribute or a param name of the point.
+    @ivar calls: The number of injections when the counters are enabled.
+    @ivar time: The cumulative time of the injections in seconds.
+    '''
+    
+    __slots__ = ('type', 'none', 'owner', 'name', 'calls', 'time',
+                 '__weakref__')
     
     def __init__(self, type, none=False):
         self.type = type
         self.none = none
+        self.owner = None
+        self.name = None
+        self.calls = 0
+        self.time = 0.0
+        _points[self] = True
+    
+    def __repr__(self):
+        return '<%s for %r>' % (self.__class__.__name__, self.type)
     
     def get_instance(self):
         '''Return an instance for the injection point type.'''
+        if _counting:
+            return self._get_counted_instance()
         return _get_instance(self.type, none=self.none)
+    
+    def _get_counted_instance(self):
+        start = time.time()
+        try:
+            return _get_instance(self.type, none=self.none)
+        finally:
+            self.calls += 1
+            self.time += time.time() - start
 
 
 class AttributeInjection(object):
@@ -158,13 +286,21 @@ class AttributeInjection(object):
         if attr is None:
             attr = self._get_set_attr(owner)
         
+        if self.injection.owner is None:
+            self.injection.owner = owner
+        
         obj = self.injection.get_instance()
         setattr(instance, attr, obj)
         return obj
     
     def _get_set_attr(self, owner):
-        attr = get_attrname_by_value(owner, self)
+        attr = None
+        if _planned_attrs:
+            attr = _get_planned_attrname(owner, self)
+        if attr is None:
+            attr = get_attrname_by_value(owner, self)
         self.attr = attr
+        self.injection.name = attr
         return attr
 
 
@@ -190,6 +326,7 @@ class NamedAttributeInjection(AttributeInjection):
         '''Create an injection for an attribute.'''
         super(NamedAttributeInjection, self).__init__(type, none)
         self.attr = attr
+        self.injection.name = attr
 
 
 class ClassAttributeInjection(object):
@@ -210,7 +347,12 @@ class ClassAttributeInjection(object):
         self.injection = InjectionPoint(type, none)
     
     def __get__(self, instance, owner):
-        return self.injection.get_instance()
+        injection = self.injection
+        if _counting and injection.owner is None:
+            injection.owner = owner
+            injection.name = get_attrname_by_value(owner, self)
+        
+        return injection.get_instance()
 
 
 class ParamInjection(object):
@@ -248,6 +390,7 @@ class ParamInjection(object):
             type = name
         
         injection = InjectionPoint(type, none)
+        injection.name = name
         
         def decorator(func):
             if getattr(func, 'injection_wrapper', False):
@@ -255,6 +398,7 @@ class ParamInjection(object):
                 wrapper = func
             else:
                 wrapper = cls.create_wrapper(func)
+            injection.owner = wrapper.func
             cls.add_injection(wrapper, name, injection)
             return wrapper
         
@@ -37,19 +37,109 @@ a bound application scope. Scopes are stored in a stack. By default,
 they are accessed in this order: [application, thread, request].
 
 '''
+import gc
+import inspect
 import logging
+import sys
 import threading
+import time
+from Queue import Queue
+from contextlib import contextmanager
 from functools import update_wrapper
 
+from inject.disposal import dispose, dispose_all
 from inject.exc import InjectorAlreadyRegistered, NoInjectorRegistered, \
-    NotBoundError, AutobindingFailed
+    NotBoundError, AutobindingFailed, NoRequestError, VerificationFailed, \
+    FactoryTimeout, BackoffError
+from inject.failures import FailureCache
+from inject.graph import DependencyGraph, get_dependencies
 from inject.log import configure_stdout_handler
-from inject.scopes import ApplicationScope, ThreadScope, RequestScope
+from inject.pools import ThreadPool
+from inject.profiling import StartupProfiler
+from inject.scopes import AbstractScope, ApplicationScope, ThreadScope, \
+    RequestScope, _wrap_injector
+from inject.stats import InjectorStats
 
 
 logger = logging.getLogger('inject')
 
 
+'''
+@var PREFORK_GC_THRESHOLD: The generation 2 threshold of the garbage
+    collector in forked children after a prefork L{warmup <Injector.warmup>}
+    on Python versions without C{gc.freeze}.
+'''
+PREFORK_GC_THRESHOLD = 1000
+
+
+def _profiled(kind):
+    '''Return a decorator which profiles an injector method, which takes
+    a type as its first argument, when the injector has a profiler.
+    '''
+    def decorator(func):
+        def wrapper(self, type, *args, **kwargs):
+            profiler = self.profiler
+            if profiler is None:
+                return func(self, type, *args, **kwargs)
+            
+            with profiler.record(kind, type):
+                return func(self, type, *args, **kwargs)
+        
+        update_wrapper(wrapper, func)
+        return wrapper
+    
+    return decorator
+
+
+def _measured(func):
+    '''Decorator which measures the construction time of a type, the first
+    argument of an injector method, when the injector collects stats.
+    '''
+    def wrapper(self, type, *args, **kwargs):
+        if not self.collect_stats:
+            return func(self, type, *args, **kwargs)
+        
+        start = time.time()
+        try:
+            return func(self, type, *args, **kwargs)
+        finally:
+            self.stats.constructed(type, time.time() - start)
+    
+    update_wrapper(wrapper, func)
+    return wrapper
+
+
+def _guarded(func):
+    '''Decorator which records the construction failures of a type, the first
+    argument of an injector method, and fails fast during their backoff,
+    when the injector has a failure cache.
+    
+    A missing request and a backoff of a dependency are not construction
+    failures of the type, and are not recorded.
+    '''
+    def wrapper(self, type, *args, **kwargs):
+        failures = self.failures
+        if failures is None:
+            return func(self, type, *args, **kwargs)
+        
+        failures.check(type)
+        try:
+            inst = func(self, type, *args, **kwargs)
+        except Exception, e:
+            error = e
+            if isinstance(error, AutobindingFailed):
+                error = error.caused_by
+            if not isinstance(error, (NoRequestError, BackoffError)):
+                failures.failed(type, e)
+            raise
+        
+        failures.succeeded(type)
+        return inst
+    
+    update_wrapper(wrapper, func)
+    return wrapper
+
+
 class Injector(object):
     
     '''C{Injector} provides injection points with bindings, delegates storing
@@ -60,7 +150,8 @@ class Injector(object):
     
     logger = logging.getLogger('inject.Injector')
     
-    def __init__(self, autobind=True, echo=False):
+    def __init__(self, autobind=True, echo=False, profile=False, stats=False,
+                 backoff=None):
         '''Create a new injector instance.
         
         @ivar autobind: Whether to autobind not bound types, 
@@ -69,11 +160,40 @@ class Injector(object):
         @ivar echo: When set to true creates a default C{inject} logger,
             adds an stdout handler, and sets the logging level to DEBUG.
             It affects all injectors.
+        
+        @ivar profile: When set to true creates a L{StartupProfiler
+            <inject.profiling.StartupProfiler>} as the C{profiler} attribute,
+            which records binds, factories and autobinding. Set the attribute
+            to None to stop profiling.
+        
+        @ivar stats: When set to true counts resolutions and measures
+            constructions in the C{stats} attribute, see L{inject.stats}.
+            Enable or disable it later with the C{collect_stats} attribute.
+        
+        @ivar backoff: An optional L{Backoff <inject.failures.Backoff>} policy.
+            When given, construction failures are stored in the C{failures}
+            attribute, and the failed types are not constructed again during
+            their backoff delay, see L{inject.failures}.
         '''
         self.autobind = autobind
         if echo:
             configure_stdout_handler()
         
+        self.profiler = None
+        if profile:
+            self.profiler = StartupProfiler()
+        
+        self.stats = InjectorStats()
+        self.collect_stats = stats
+        
+        self.failures = None
+        if backoff is not None:
+            self.failures = FailureCache(backoff)
+        
+        # Set it to a SamplingTracer to sample resolutions, see inject.tracing.
+        self.tracer = None
+        
+        self._prefork_gc = False
         self._init()
     
     def _init(self):
@@ -82,6 +202,12 @@ class Injector(object):
         '''
         self._scopes = {}
         self._scopes_stack = []
+        self._local_scopes = []
+        self._routes = {}
+        self._misses = set()
+        self._pins = {}
+        self._generation = 0
+        self._transaction_lock = threading.Lock()
         
         self._app_scope = ApplicationScope()
         self.bind_scope(ApplicationScope, self._app_scope)
@@ -115,6 +241,7 @@ class Injector(object):
         '''Return true if type is bound, else return False.'''
         return self.is_bound(type)
     
+    @_profiled('bind')
     def bind(self, type, to=None):
         '''Set a binding for a type in the application scope.'''
         if self.is_bound(type):
@@ -145,37 +272,208 @@ class Injector(object):
         
         @raise NotBoundError: if there is no binding for a type,
             and autobind is false or the type is not callable.
+        @raise BackoffError: if the type construction has failed recently,
+            and the injector has a backoff policy.
         '''
-        for scope in self._scopes_stack:
-            if scope.is_bound(type) or scope.is_factory_bound(type):
+        tracer = self.tracer
+        if tracer is not None and tracer.should_sample():
+            return tracer.trace(self, type, none)
+        
+        if self.collect_stats:
+            self.stats.resolved(type)
+        
+        pin = self._pins.get(type)
+        if pin is not None:
+            scope = self._scopes.get(pin)
+            if scope is not None:
+                if scope.is_bound(type):
+                    return scope.get(type)
+                if scope.is_factory_bound(type):
+                    return self._create(type, scope)
+        
+        scope = self._routes.get(type)
+        if scope is not None:
+            if scope.is_bound(type):
                 return scope.get(type)
+            
+            if scope.is_factory_bound(type):
+                return self._create(type, scope)
+        
+        if type in self._misses:
+            # A known miss, only the thread-local bindings can have changed.
+            for scope in self._local_scopes:
+                if scope.is_bound(type):
+                    return scope.get(type)
+                if scope.is_factory_bound(type):
+                    return self._create(type, scope)
         
+        else:
+            generation = self._generation
+            scope = self._route(type)
+            if scope is not None:
+                if scope.is_bound(type):
+                    return scope.get(type)
+                return self._create(type, scope)
+            
+            if generation == self._generation:
+                self._misses.add(type)
+        
+        return self._missing(type, none)
+    
+    def _missing(self, type, none):
+        '''Autobind a type which is not bound in any scope, or return None,
+        or raise an error (see L{get}). A class decorated with L{scoped
+        <inject.scopes.scoped>} is bound as a factory in its scope and pinned.
+        '''
         if self.autobind and callable(type):
-            try:
-                inst = type()
-            except Exception, e:
-                raise AutobindingFailed(type, e)
+            scope_type = getattr(type, '__inject_scope__', None)
+            if scope_type is not None:
+                self.bind_factory(type, type, scope=scope_type)
+                return self._create(type, self._scopes[scope_type])
             
-            self.bind(type, inst)
-            return inst
+            return self._autobind(type)
         
         if none:
             return
         
         raise NotBoundError(type)
     
+    def get_resolution(self, type):
+        '''Return a tuple of the scope which serves a type (or None), and
+        C{'factory'} or C{'autobind'} when L{get} will create an instance
+        (else None). It does not create any instances.
+        '''
+        scope = self._routes.get(type)
+        if scope is None or not (scope.is_bound(type) or
+                                 scope.is_factory_bound(type)):
+            scope = self._route(type)
+        
+        if scope is not None:
+            if scope.is_bound(type):
+                return scope, None
+            return scope, 'factory'
+        
+        if self.autobind and callable(type):
+            return None, 'autobind'
+        return None, None
+    
+    def _route(self, type):
+        '''Return the first scope in the stack where a type or its factory
+        is bound and cache it in the routes, or return None.
+        
+        A cached route is checked on every L{get}, and is dropped when
+        the type is bound in another scope (see L{_on_scope_change}).
+        A route is not cached when the scopes have changed during the lookup,
+        or when it is at or behind a thread-local scope in the stack, because
+        the routes are shared by all threads.
+        '''
+        generation = self._generation
+        local = False
+        for scope in self._scopes_stack:
+            if not isinstance(scope, AbstractScope) or scope.local:
+                local = True
+            
+            if scope.is_bound(type) or scope.is_factory_bound(type):
+                if not local and generation == self._generation:
+                    self._routes[type] = scope
+                return scope
+    
+    def _on_scope_change(self, scope, type):
+        '''Scope listener, drop a route or a pin when a type is bound in
+        another scope, and drop the type from the known misses.
+        '''
+        route = self._routes.get(type)
+        if route is not None and route is not scope:
+            self._routes.pop(type, None)
+        
+        pin = self._pins.get(type)
+        if pin is not None and self._scopes.get(pin) is not scope:
+            self.unpin(type)
+        
+        self._generation += 1
+        self._misses.discard(type)
+    
+    def _get_autobind(self):
+        return self._autobind_enabled
+    
+    def _set_autobind(self, autobind):
+        self._autobind_enabled = autobind
+        misses = getattr(self, '_misses', None)
+        if misses is not None:
+            misses.clear()
+    
+    autobind = property(_get_autobind, _set_autobind)
+    
+    @_profiled('factory')
+    @_guarded
+    @_measured
+    def _create(self, type, scope):
+        '''Return an instance created by a scope factory, count its timeouts.
+        '''
+        try:
+            return scope.get(type)
+        except FactoryTimeout:
+            self.stats.timed_out(type)
+            raise
+    
+    @_profiled('autobind')
+    @_guarded
+    @_measured
+    def _autobind(self, type):
+        '''Instantiate and bind a type in the application scope.
+        
+        @raise AutobindingFailed: if the type raises an error.
+        '''
+        try:
+            inst = type()
+        except Exception, e:
+            raise AutobindingFailed(type, e)
+        
+        self._bind_created(type, inst)
+        return inst
+    
+    @_profiled('bind')
+    def _bind_created(self, type, inst):
+        '''Bind an autobound instance in the application scope, see
+        L{AbstractScope.bind_created}.
+        '''
+        self._app_scope.bind_created(type, inst)
+    
     #==========================================================================
     # Factories
     #==========================================================================
     
-    def bind_factory(self, type, factory):
-        '''Bind a type factory in the application scope
+    @_profiled('bind_factory')
+    def bind_factory(self, type, factory, per_process=False, timeout=None,
+                     scope=None):
+        '''Bind a type factory in the application scope or in another scope
         (at first, unbind an existing one if present).
+        
+        @param per_process: If true, the instance is recreated in each forked
+            child process, see L{inject.forks}.
+        @param timeout: If given, L{get} raises L{FactoryTimeout} when
+            the factory does not return within timeout seconds, see
+            L{AbstractScope.bind_factory}. Timeouts are counted in the stats.
+        @param scope: An optional scope type, i.e. C{RequestScope}. The factory
+            is bound in this scope, and the type is pinned to it (see L{pin}).
+        
+        @raise ValueError: if the scope is not bound.
         '''
+        if scope is not None and scope not in self._scopes:
+            raise ValueError('Scope %r is not bound.' % scope)
+        
         if self.is_factory_bound(type):
             self.unbind_factory(type)
         
-        self._app_scope.bind_factory(type, factory)
+        if scope is None:
+            self._app_scope.bind_factory(type, factory,
+                                         per_process=per_process,
+                                         timeout=timeout)
+        else:
+            self._scopes[scope].bind_factory(type, factory,
+                                             per_process=per_process,
+                                             timeout=timeout)
+            self.pin(type, scope)
     
     def unbind_factory(self, type):
         '''Unbind the first occurrence of a type factory in any scope.'''
@@ -198,6 +496,25 @@ class Injector(object):
     # Scopes
     #==========================================================================
     
+    def pin(self, type, scope_type):
+        '''Pin a type to a scope, so that L{get} goes straight to the scope
+        instead of searching the scopes stack. When the scope does not have
+        a binding or a factory for the type, L{get} falls back to the stack.
+        
+        A type is unpinned when it is bound in another scope.
+        '''
+        self._pins[type] = scope_type
+        self.logger.info('Pinned %r to %r.', type, scope_type)
+    
+    def unpin(self, type):
+        '''Unpin a type if it is pinned, else do nothing.'''
+        if self._pins.pop(type, None) is not None:
+            self.logger.info('Unpinned %r.', type)
+    
+    def get_pin(self, type):
+        '''Return a scope type which a type is pinned to, or None.'''
+        return self._pins.get(type)
+    
     def bind_scope(self, scope_type, scope):
         '''Bind a new scope, unbind another one if present.'''
         self.unbind_scope(scope_type)
@@ -205,6 +522,9 @@ class Injector(object):
         self.bind(scope_type, scope)
         self._scopes[scope_type] = scope
         self._scopes_stack.append(scope)
+        self._update_local_scopes()
+        if isinstance(scope, AbstractScope):
+            scope.listener = self._on_scope_change
         
         self.logger.info('Bound scope %r to %r.', scope_type, scope)
     
@@ -217,13 +537,389 @@ class Injector(object):
         scope = self._scopes[scope_type]
         del self._scopes[scope_type]
         self._scopes_stack.remove(scope)
+        self._update_local_scopes()
+        if isinstance(scope, AbstractScope):
+            scope.listener = None
         
         self.logger.info('Unbound scope %r.', scope)
     
+    def _update_local_scopes(self):
+        '''Clear the resolution caches, and find the scopes which must be
+        checked for known misses, i.e. thread-local scopes and custom scopes
+        which do not notify the injector of their bindings.
+        '''
+        self._routes.clear()
+        self._generation += 1
+        self._misses.clear()
+        self._local_scopes = [scope for scope in self._scopes_stack
+                              if not isinstance(scope, AbstractScope) or
+                              scope.local]
+    
+    #==========================================================================
+    # Transactions
+    #==========================================================================
+    
+    @contextmanager
+    def transaction(self):
+        '''Context manager which yields a copy of the application scope,
+        and publishes it atomically instead of the current one on exit,
+        so that readers see either the old or the new bindings. The resolution
+        caches are cleared once. Changes are discarded when the block raises
+        an exception.
+        
+        Transactions are serialized. Instances which are created in the old
+        application scope during a transaction (by its factories or by
+        autobinding, i.e. by concurrent gets) are moved into the new scope
+        on exit, including the ones created after the new scope has been
+        published. When the transaction has changed their types, they are
+        disposed instead (see L{inject.disposal}). Objects which are bound
+        explicitly in the old scope are owned by the caller, they are neither
+        moved nor disposed.
+        
+        Example::
+            
+            with injector.transaction() as scope:
+                scope.bind(Backend, new_backend)
+                scope.bind_factory(Client, create_client)
+                scope.unbind(Feature)
+        
+        '''
+        with self._transaction_lock:
+            old = self._app_scope
+            new = old.copy()
+            new.bind_created(ApplicationScope, new)
+            initial = dict(old._bindings)
+            changes = _Changes(old.journal)
+            old.journal = changes
+            
+            try:
+                yield new
+            except:
+                old.journal = changes.journal
+                raise
+            
+            stack = list(self._scopes_stack)
+            stack[stack.index(old)] = new
+            scopes = dict(self._scopes)
+            scopes[ApplicationScope] = new
+            new.listener = self._on_scope_change
+            
+            self._scopes = scopes
+            self._scopes_stack = stack
+            self._app_scope = new
+            old.listener = lambda scope, type: self._move_created(
+                old, new, type, changes)
+            self._update_local_scopes()
+            
+            for type, inst in old._bindings.items():
+                if type not in initial or initial[type] is not inst:
+                    self._move_created(old, new, type, changes)
+            
+            self.logger.info('Published a new application scope %r.', new)
+    
+    def _move_created(self, old, new, type, changes):
+        '''Move an instance of a type, which has been created in the old
+        application scope during a L{transaction}, into the new one, or
+        dispose it when the transaction has changed the type. Explicitly
+        changed types are skipped.
+        '''
+        if type in changes.types:
+            return
+        
+        inst = old._bindings.get(type)
+        if not new.is_bound(type) and \
+                new.get_factory(type) is old.get_factory(type):
+            new.bind_created(type, inst)
+        elif new._bindings.get(type) is not inst:
+            self.logger.info('Disposing %r created during a transaction.',
+                             inst)
+            dispose(inst)
+    
+    def bind_many(self, bindings):
+        '''Bind types to objects in the application scope in a single
+        L{transaction}.
+        
+        @param bindings: A dict of types to objects.
+        '''
+        with self.transaction() as scope:
+            for type, to in bindings.iteritems():
+                scope.bind(type, to)
+    
     def is_scope_bound(self, scope_type):
         '''Return true if a scope is bound.'''
         return scope_type in self._scopes
     
+    def get_scopes(self):
+        '''Return a list of the bound scopes in the stack order.'''
+        return list(self._scopes_stack)
+    
+    def verify(self, points=None, resolve=False):
+        '''Check that injection points can be resolved, and precompute their
+        routes, so that the first real request does not search the scopes.
+        Optional points (C{none=True}) are skipped.
+        
+        @param points: Injection points to verify, the default is all existing
+            points (see L{inject.injections.get_injection_points}).
+        @param resolve: If true, also resolve the points, i.e. instantiate
+            their factories and autobind their types. Request-scoped points
+            are resolved only when there is a request.
+        
+        @raise VerificationFailed: if any point cannot be resolved.
+        '''
+        if points is None:
+            from inject.injections import get_injection_points
+            points = get_injection_points()
+        
+        errors = []
+        for point in points:
+            type = point.type
+            scope = self._routes.get(type) or self._route(type)
+            if scope is None and not (self.autobind and callable(type)):
+                if not point.none:
+                    errors.append((point, NotBoundError(type)))
+                continue
+            
+            if not resolve:
+                continue
+            
+            try:
+                self.get(type, none=point.none)
+            except NoRequestError:
+                pass
+            except Exception, e:
+                errors.append((point, e))
+        
+        if errors:
+            raise VerificationFailed(errors)
+        
+        self.logger.info('Verified %s injection points.', len(points))
+    
+    def warmup(self, types=None, prefork=False, workers=1):
+        '''Instantiate the application-scoped factories and the given types
+        (autobind them if they are not bound), return a list of the types
+        in the order they have been created.
+        
+        The dependencies of the factories and types are discovered from their
+        injections (see L{inject.graph}), and are created first. Unbound
+        classes, which are dependencies, are autobound too.
+        
+        @param workers: The number of threads which create independent
+            objects concurrently, so that I/O-bound factories overlap.
+        @param prefork: If true, skip per-process factories, then collect
+            garbage and freeze all objects out of the GC generations
+            (C{gc.freeze}, Python 3.7+), so that the garbage collector in
+            forked children does not write to (and copy) the shared pages.
+            Without C{gc.freeze}, L{after_fork} raises the generation 2
+            threshold in children to L{PREFORK_GC_THRESHOLD}, so that full
+            collections, which touch all the shared objects, are rare.
+            Use L{inject.forks.memory_usage} in a child to check how much
+            memory stays shared.
+        '''
+        scope = self._app_scope
+        roots = list(types or ())
+        for type in scope.factory_types():
+            if not (prefork and scope.is_per_process(type)):
+                roots.append(type)
+        
+        graph = self._get_warmup_graph(roots, prefork)
+        if workers > 1:
+            warmed = self._warmup_concurrently(graph, workers)
+        else:
+            warmed = graph.toposort()
+            for type in warmed:
+                self.get(type)
+        
+        if prefork:
+            gc.collect()
+            freeze = getattr(gc, 'freeze', None)
+            if freeze is not None:
+                freeze()
+            else:
+                self._prefork_gc = True
+        
+        self.logger.info('Warmed up %s types.', len(warmed))
+        return warmed
+    
+    def _get_warmup_graph(self, roots, prefork):
+        '''Return a dependency graph of the roots, their not instantiated
+        application-scoped dependencies and unbound classes.
+        '''
+        scope = self._app_scope
+        graph = DependencyGraph()
+        queue = list(roots)
+        while queue:
+            type = queue.pop()
+            if type in graph:
+                continue
+            
+            if scope.is_factory_bound(type):
+                factory = scope.get_factory(type)
+            else:
+                factory = type
+            
+            deps = []
+            for dep in get_dependencies(factory):
+                if scope.is_factory_bound(dep):
+                    if scope.is_bound(dep) or \
+                            (prefork and scope.is_per_process(dep)):
+                        continue
+                elif not (self.autobind and inspect.isclass(dep)) or \
+                        self.is_bound(dep) or self.is_factory_bound(dep):
+                    continue
+                deps.append(dep)
+            
+            graph.add(type, deps)
+            queue.extend(deps)
+        
+        return graph
+    
+    def _warmup_concurrently(self, graph, workers):
+        '''Create the graph nodes in a thread pool, each node is submitted
+        when its dependencies have been created. Nodes in cycles are created
+        in the current thread at the end. The pool threads use the current
+        injector, see L{use_injector}.
+        '''
+        remaining = {}
+        for type in graph.dependencies:
+            remaining[type] = set(graph.get_dependencies(type))
+        dependents = graph.get_dependents()
+        done = Queue()
+        
+        def create(type):
+            try:
+                self.get(type)
+            except Exception:
+                done.put((type, sys.exc_info()))
+            else:
+                done.put((type, None))
+        
+        create = _wrap_injector(create)
+        pool = ThreadPool(workers)
+        ready = [type for type, deps in remaining.iteritems() if not deps]
+        running = 0
+        warmed = []
+        exc_info = None
+        try:
+            while True:
+                if exc_info is None:
+                    for type in ready:
+                        del remaining[type]
+                        pool.submit(create, type)
+                        running += 1
+                ready = []
+                
+                if not running:
+                    break
+                
+                type, type_exc_info = done.get()
+                running -= 1
+                if type_exc_info is not None:
+                    exc_info = exc_info or type_exc_info
+                    continue
+                
+                warmed.append(type)
+                for dependent in dependents.get(type, ()):
+                    deps = remaining.get(dependent)
+                    if deps is None:
+                        continue
+                    
+                    deps.discard(type)
+                    if not deps:
+                        ready.append(dependent)
+        finally:
+            pool.shutdown()
+        
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+        
+        for type in remaining:
+            self.get(type)
+            warmed.append(type)
+        return warmed
+    
+    def dispose(self):
+        '''Dispose and unbind the instances which have been created by
+        the application scope factories, see L{inject.disposal}. Bound
+        objects are not disposed, they are owned by the caller.
+        '''
+        scope = self._app_scope
+        types = [type for type in scope.factory_types() if scope.is_bound(type)]
+        objs = [scope.get(type) for type in types]
+        for type in types:
+            scope.unbind(type)
+        
+        dispose_all(objs)
+        self.logger.info('Disposed %s instances.', len(objs))
+    
+    @contextmanager
+    def override(self, bindings):
+        '''Context manager which binds types to objects in the application
+        scope, and restores their previous bindings and factories in all
+        scopes, and the pins (see L{pin}) on exit. Only the given types are
+        changed.
+        
+        Example::
+            
+            with injector.override({Database: FakeDatabase()}):
+                run_test()
+        
+        @param bindings: A dict of types to objects.
+        '''
+        scopes = [scope for scope in self._scopes_stack
+                  if isinstance(scope, AbstractScope)]
+        states = []
+        pins = dict(self._pins)
+        try:
+            for type, to in bindings.iteritems():
+                states.append((type, [scope.get_state(type)
+                                      for scope in scopes]))
+                for scope in scopes:
+                    scope.set_state(type, None)
+                
+                self._app_scope.bind(type, to)
+                self._invalidate(type)
+            
+            yield self
+        
+        finally:
+            for type, scope_states in reversed(states):
+                for scope, state in zip(scopes, scope_states):
+                    scope.set_state(type, state)
+                self._invalidate(type)
+            
+            self._pins = pins
+            self._routes.clear()
+    
+    def _invalidate(self, type):
+        '''Drop the cached route and miss of a type.'''
+        self._routes.pop(type, None)
+        self._generation += 1
+        self._misses.discard(type)
+    
+    def child(self):
+        '''Return a new L{ChildInjector}, which overlays this injector.'''
+        return ChildInjector(self)
+    
+    def after_fork(self):
+        '''Reset the scopes and the locks in a forked child process,
+        see L{inject.forks}.
+        '''
+        self._transaction_lock = threading.Lock()
+        if self.failures is not None:
+            self.failures.after_fork()
+        
+        if self._prefork_gc:
+            threshold0, threshold1, threshold2 = gc.get_threshold()
+            gc.set_threshold(threshold0, threshold1,
+                             max(threshold2, PREFORK_GC_THRESHOLD))
+        
+        for scope in self._scopes_stack:
+            after_fork = getattr(scope, 'after_fork', None)
+            if after_fork is not None:
+                after_fork()
+        
+        self.logger.info('Reset the scopes after a fork.')
+    
     #==========================================================================
     # Registering/unregistering
     #==========================================================================
@@ -248,6 +944,59 @@ class Injector(object):
         return is_registered(self)
 
 
+class ChildInjector(Injector):
+    
+    '''ChildInjector overlays a parent injector. It has its own application
+    scope, and falls back to the parent for types which are not bound in it.
+    
+    It does not copy the parent bindings and does not create thread
+    and request scopes, so it is cheap to create for a tenant, a test or
+    a single request, and to throw away. Bindings, factories and autobound
+    types of the parent are resolved by the parent (and stored in its scopes).
+    
+    Example::
+        
+        child = injector.child()
+        child.bind(Config, tenant_config)
+        
+        child.get(Config)   # The tenant config.
+        child.get(Database) # The parent database.
+    
+    @note: Injection points use the current injector, so they see
+        the child bindings only inside L{use_injector}, or when the child
+        is registered.
+    '''
+    
+    logger = logging.getLogger('inject.ChildInjector')
+    
+    def __init__(self, parent, echo=False, profile=False, stats=False,
+                 backoff=None):
+        '''Create a new child injector.
+        
+        @param parent: The parent injector.
+        '''
+        self.parent = parent
+        super(ChildInjector, self).__init__(autobind=False, echo=echo,
+            profile=profile, stats=stats, backoff=backoff)
+    
+    def _default_config(self):
+        '''Bind Injector to self, the parent scopes are not bound.'''
+        self.bind(Injector, to=self)
+    
+    def _missing(self, type, none):
+        '''Return an instance from the parent.'''
+        return self.parent.get(type, none=none)
+    
+    def get_resolution(self, type):
+        '''Return the resolution of a type in this injector, or in
+        the parent, see L{Injector.get_resolution}.
+        '''
+        resolution = super(ChildInjector, self).get_resolution(type)
+        if resolution[0] is not None:
+            return resolution
+        return self.parent.get_resolution(type)
+
+
 class LazyInjector(object):
     
     '''C{LazyInjector} creates, registers and configures a real injector
@@ -318,32 +1067,89 @@ class LazyInjector(object):
             register(injector)
             
             self.logger.info('Configuring %s with %s.', injector, self.config)
-            self.config(injector)
+            profiler = getattr(injector, 'profiler', None)
+            if profiler is not None:
+                with profiler.record('config', self.config):
+                    self.config(injector)
+            else:
+                self.config(injector)
             
             return injector
 
 
+class _Changes(object):
+    
+    '''Journal which collects the explicitly changed types of the old
+    application scope during a L{transaction <Injector.transaction>},
+    and passes the changes to the previous journal, if any.
+    '''
+    
+    def __init__(self, journal):
+        self.journal = journal
+        self.types = set()
+    
+    def record(self, scope, type):
+        self.types.add(type)
+        if self.journal is not None:
+            self.journal.record(scope, type)
+
+
+class _Local(threading.local):
+    
+    injector = None
+
+
 _REG_LOCK = threading.RLock()
 _INJECTOR = None
+_LOCAL = _Local()
 
 
 def get_injector():
-    '''Return the current registered injector.'''
-    return _INJECTOR
+    '''Return the current injector, see L{use_injector},
+    or the registered one.
+    '''
+    injector = _LOCAL.injector
+    if injector is None:
+        return _INJECTOR
+    return injector
 
 
 def get_instance(type, none=False):
-    '''Return an instance from the registered injector.
+    '''Return an instance from the current injector, see L{use_injector},
+    or from the registered one.
     
     @raise NoInjectorRegistered: if no injector is registered.
     '''
-    injector = _INJECTOR
+    injector = _LOCAL.injector
     if injector is None:
-        raise NoInjectorRegistered()
+        injector = _INJECTOR
+        if injector is None:
+            raise NoInjectorRegistered()
     
     return injector.get(type, none=none)
 
 
+@contextmanager
+def use_injector(injector):
+    '''Context manager which makes an injector current in this thread
+    (or greenlet, when C{threading} is monkey-patched), instead of
+    the registered one. It does not take the registration lock.
+    
+    Example::
+        
+        with use_injector(tenants.get(tenant)):
+            handle(request)
+    
+    '''
+    local = _LOCAL
+    previous = local.injector
+    local.injector = injector
+    try:
+        yield injector
+    finally:
+        local.injector = previous
+
+
 def _synchronized(func):
     def wrapper(*args, **kwargs):
         with _REG_LOCK:
@@ -354,21 +1160,37 @@ def _synchronized(func):
 
 
 @_synchronized
-def create(autobind=True, echo=False):
+def create(autobind=True, echo=False, profile=False, stats=False,
+           backoff=None):
     '''Create, register and return a new injector.
     
     @raise InjectorAlreadyRegistered: if another injector is already registered.
     '''
-    injector = Injector(autobind=autobind, echo=echo)
+    injector = Injector(autobind=autobind, echo=echo, profile=profile,
+                        stats=stats, backoff=backoff)
     register(injector)
     return injector
 
 
 @_synchronized
-def create_lazy(config, factory=Injector, autobind=True, echo=False):
-    '''Create, register and return a new lazy injector.'''
+def create_lazy(config, factory=Injector, autobind=True, echo=False,
+                profile=False, stats=False, backoff=None):
+    '''Create, register and return a new lazy injector.
+    
+    The C{profile}, C{stats} and C{backoff} arguments are passed to
+    the factory only when they are given, so that custom factories which
+    accept only C{autobind} and C{echo} still work.
+    '''
+    kwargs = {}
+    if profile:
+        kwargs['profile'] = profile
+    if stats:
+        kwargs['stats'] = stats
+    if backoff is not None:
+        kwargs['backoff'] = backoff
+    
     injector = LazyInjector(config, factory=factory, autobind=autobind,
-                            echo=echo)
+                            echo=echo, **kwargs)
     register(injector)
     return injector
 
@@ -396,9 +1218,10 @@ def unregister(injector=None):
     logger.info('Unregistered %r.', latter)
 
 
-@_synchronized
 def is_registered(injector=None):
-    '''Return true if a given injector, or any injector is registered.'''
+    '''Return true if a given injector, or any injector is registered.
+    It does not take the registration lock.
+    '''
     registered = _INJECTOR
     if injector:
         return registered is injector
@@ -1,6 +1,7 @@
 '''Request scope middleware for WSGI and Django applications. It registers
 and unregisters a thread-local storage for each request.
 '''
+import inject.forks
 import inject.scopes
 
 
@@ -16,13 +17,20 @@ class WsgiInjectMiddleware(object):
     
     scope = inject.class_attr(inject.scopes.RequestScope)
     
-    def __init__(self, app):
+    def __init__(self, app, prefetch=None):
+        '''Wrap a WSGI application.
+        
+        @param prefetch: Types which are prefetched when a request starts,
+            see L{RequestScope.start <inject.scopes.RequestScope.start>}.
+        '''
         self.app = app
+        self.prefetch = prefetch
     
     def __call__(self, environ, start_response):
+        inject.forks.check_fork()
         scope = self.scope
         try:
-            scope.start()
+            scope.start(self.prefetch)
             # We have to manually iterate over the response,
             # so that all its parts have been generated before
             # the request is unregistered.
@@ -40,16 +48,21 @@ class DjangoInjectMiddleware(object):
     It is recommended to put it before any other middleware. Otherwise, it is
     possible that you will use injection in another middleware when the request
     scope has been already unregistered.
+    
+    Subclass it and set C{prefetch} to the types which are prefetched when
+    a request starts, see L{inject.scopes.RequestScope.start}.
     '''
     
     scope = inject.class_attr(inject.scopes.RequestScope)
+    prefetch = None
     
     def process_request(self, request):
         '''Register a request scope for a request.'''
         from django.http import HttpRequest
         
+        inject.forks.check_fork()
         scope = self.scope
-        scope.start()
+        scope.start(self.prefetch)
         scope.bind(HttpRequest, request)
     
     def process_response(self, request, response):
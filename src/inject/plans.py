@@ -0,0 +1,130 @@
+'''Persisted injection plans for faster startups.
+L{save_plan} stores the attribute names of L{inject.attr
+<inject.injections.AttributeInjection>} injections, which have been
+discovered in this process, into a file (using C{marshal}). L{load_plan}
+loads them in the next process, so that the injections skip the attribute
+name discovery. Finding a name of an injection which is declared in a base
+class requires C{inspect.getmembers}, and is the most expensive part of
+the first access.
+
+A plan is keyed by a hash of the Python version and the paths, modification
+times and sizes of the modules which declare the injections. A stale plan
+(or an unreadable file) is ignored, and each planned name is verified
+before it is used, so a plan never changes the injection results.
+
+Example::
+    
+    # At startup, before the first request.
+    inject.plans.load_plan('/var/cache/myapp/inject.plan')
+    
+    # After warmup, i.e. at the end of a deployment smoke test.
+    inject.plans.save_plan('/var/cache/myapp/inject.plan')
+
+'''
+import hashlib
+import inspect
+import logging
+import marshal
+import os
+import sys
+
+from inject import injections
+from inject.injections import AttributeInjection, get_injection_points
+from inject.utils import get_class_key
+
+
+logger = logging.getLogger('inject.plans')
+
+
+def get_hash(files):
+    '''Return a hash of the Python version and the paths, modification
+    times and sizes of files, or None if any of them does not exist.
+    '''
+    md5 = hashlib.md5(sys.version)
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        md5.update('%s:%s:%s\n' % (path, stat.st_mtime, stat.st_size))
+    return md5.hexdigest()
+
+
+def create_plan():
+    '''Return a plan dict of the attribute injections in this process.'''
+    attrs = {}
+    files = set()
+    for point in get_injection_points():
+        owner = point.owner
+        if not inspect.isclass(owner) or point.name is None:
+            continue
+        
+        descriptor = _get_descriptor(owner, point.name)
+        if not isinstance(descriptor, AttributeInjection) or \
+                descriptor.injection is not point:
+            continue
+        
+        module = sys.modules.get(owner.__module__)
+        path = getattr(module, '__file__', None)
+        if path is None:
+            continue
+        
+        files.add(os.path.abspath(path))
+        names = attrs.setdefault(get_class_key(owner), [])
+        if point.name not in names:
+            names.append(point.name)
+    
+    files = sorted(files)
+    return {'hash': get_hash(files), 'files': files, 'attrs': attrs}
+
+
+def save_plan(path):
+    '''Create a plan and save it into a file.'''
+    plan = create_plan()
+    f = open(path, 'wb')
+    try:
+        marshal.dump(plan, f)
+    finally:
+        f.close()
+    
+    logger.info('Saved an injection plan with %s classes into %s.',
+                len(plan['attrs']), path)
+
+
+def load_plan(path):
+    '''Load a plan from a file and use it, return true if it is loaded,
+    or false if it is stale or cannot be read.
+    '''
+    try:
+        f = open(path, 'rb')
+        try:
+            plan = marshal.load(f)
+        finally:
+            f.close()
+        
+        files = plan['files']
+        valid = plan['hash'] is not None and plan['hash'] == get_hash(files)
+        attrs = plan['attrs']
+    except (IOError, EOFError, ValueError, TypeError, KeyError), e:
+        logger.info('Failed to load an injection plan from %s: %s.', path, e)
+        return False
+    
+    if not valid:
+        logger.info('Ignored a stale injection plan %s.', path)
+        return False
+    
+    injections._planned_attrs = attrs
+    logger.info('Loaded an injection plan with %s classes from %s.',
+                len(attrs), path)
+    return True
+
+
+def clear_plan():
+    '''Stop using the loaded plan.'''
+    injections._planned_attrs = {}
+
+
+def _get_descriptor(owner, name):
+    for klass in inspect.getmro(owner):
+        if name in klass.__dict__:
+            return klass.__dict__[name]
@@ -0,0 +1,180 @@
+'''Minimal thread pool which is used to run factories concurrently.
+
+L{ThreadPool} runs callables in daemon worker threads and returns a L{Future}
+for each of them. The worker threads are started lazily on the first
+L{ThreadPool.submit}. L{get_shared_pool} returns a process-wide pool which
+is shared by scopes and injectors.
+
+Example::
+    
+    pool = get_shared_pool()
+    future = pool.submit(create_session, user_id)
+    session = future.result()
+
+'''
+import logging
+import sys
+import threading
+from Queue import Queue
+
+
+'''
+@var SHARED_POOL_WORKERS: The number of threads in the shared pool.
+'''
+SHARED_POOL_WORKERS = 8
+
+
+class Future(object):
+    
+    '''Future is a result of a callable which is run by a L{ThreadPool}.'''
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._exc_info = None
+    
+    def done(self):
+        '''Return true if the callable has returned or raised an exception.'''
+        return self._event.isSet()
+    
+    def wait(self, timeout=None):
+        '''Wait for the callable at most timeout seconds (or forever when
+        None), return true if it is done.
+        '''
+        self._event.wait(timeout)
+        return self._event.isSet()
+    
+    def result(self):
+        '''Wait for the callable, and return its result or reraise
+        its exception.
+        '''
+        self._event.wait()
+        
+        if self._exc_info is not None:
+            exc_type, exc_value, exc_tb = self._exc_info
+            raise exc_type, exc_value, exc_tb
+        return self._result
+    
+    def set_result(self, result):
+        self._result = result
+        self._event.set()
+    
+    def set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self._event.set()
+
+
+class ThreadPool(object):
+    
+    '''ThreadPool runs callables in a fixed number of daemon threads.'''
+    
+    logger = logging.getLogger('inject.ThreadPool')
+    
+    def __init__(self, workers=4):
+        self.workers = workers
+        self._queue = Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+    
+    def submit(self, func, *args, **kwargs):
+        '''Schedule a callable and return its L{Future}.'''
+        if not self._threads:
+            self._start()
+        
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+    
+    def shutdown(self):
+        '''Stop the worker threads after they have finished the scheduled
+        callables.
+        '''
+        with self._lock:
+            threads = self._threads
+            self._threads = []
+            
+            for thread in threads:
+                self._queue.put(None)
+            for thread in threads:
+                thread.join()
+    
+    def after_fork(self):
+        '''Drop the parent's threads and tasks in a forked child process.'''
+        self._queue = Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run,
+                                          name='inject-pool-%s' % i)
+                thread.setDaemon(True)
+                thread.start()
+                self._threads.append(thread)
+            
+            self.logger.info('Started %s worker threads.', self.workers)
+    
+    def _run(self):
+        queue = self._queue
+        while True:
+            task = queue.get()
+            if task is None:
+                return
+            
+            future, func, args, kwargs = task
+            _call(future, func, args, kwargs)
+
+
+def _call(future, func, args, kwargs):
+    '''Call a callable, and set its result or exception in a future.'''
+    try:
+        result = func(*args, **kwargs)
+    except:
+        future.set_exc_info(sys.exc_info())
+    else:
+        future.set_result(result)
+
+
+def spawn(func, *args, **kwargs):
+    '''Run a callable in a new daemon thread and return its L{Future}.
+    
+    Unlike L{ThreadPool.submit}, a callable which hangs does not occupy
+    a pool worker.
+    '''
+    future = Future()
+    thread = threading.Thread(target=_call, name='inject-spawn',
+                              args=(future, func, args, kwargs))
+    thread.setDaemon(True)
+    thread.start()
+    return future
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool():
+    '''Return the shared thread pool, create it if it does not exist.'''
+    global _shared_pool
+    
+    pool = _shared_pool
+    if pool is not None:
+        return pool
+    
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ThreadPool(SHARED_POOL_WORKERS)
+        return _shared_pool
+
+
+def after_fork():
+    '''Reset the shared pool in a forked child process.'''
+    global _shared_pool, _shared_lock
+    
+    _shared_lock = threading.Lock()
+    if _shared_pool is not None:
+        _shared_pool.after_fork()
@@ -0,0 +1,159 @@
+'''Startup profiling of an injector configuration.
+An injector created with C{profile=True} records the wall time and
+the allocated memory of each C{bind}, C{bind_factory}, factory invocation,
+autobinding and (for L{LazyInjector <inject.injectors.LazyInjector>})
+the configuration function, together with the call stack which has
+triggered it.
+
+The memory is measured only when C{tracemalloc} is available and tracing
+(Python 3.4+, C{python -X tracemalloc}), otherwise it is None.
+
+Example::
+    
+    injector = inject.create(profile=True)
+    config(injector)
+    injector.warmup()
+    
+    print injector.profiler.report()
+    injector.profiler.write_collapsed('startup.folded')
+    # $ flamegraph.pl startup.folded > startup.svg
+
+'''
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+_INJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_CONTEXTLIB_FILE = os.path.splitext(contextmanager.func_code.co_filename)[0]
+
+
+def _get_traced_memory():
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _get_stack():
+    '''Return a list of the current call stack frames, skipping the frames
+    inside C{inject} and C{contextlib}.
+    '''
+    frames = []
+    for filename, lineno, name, line in traceback.extract_stack():
+        path = os.path.abspath(filename)
+        if os.path.dirname(path) == _INJECT_DIR or \
+                os.path.splitext(path)[0] == _CONTEXTLIB_FILE:
+            continue
+        frames.append('%s (%s:%s)' % (name, filename, lineno))
+    return frames
+
+
+class ProfileRecord(object):
+    
+    '''ProfileRecord stores a single profiled operation.
+    
+    @ivar time: Total wall time in seconds.
+    @ivar self_time: Wall time in seconds excluding nested operations.
+    @ivar memory: Allocated memory in bytes, or None.
+    '''
+    
+    def __init__(self, kind, key, stack):
+        self.kind = kind
+        self.key = key
+        self.stack = stack
+        self.time = 0.0
+        self.self_time = 0.0
+        self.memory = None
+        self._child_time = 0.0
+    
+    def __repr__(self):
+        return '<%s %s %r %.3fms>' % (self.__class__.__name__, self.kind,
+                                      self.key, self.time * 1000)
+    
+    def get_label(self):
+        return '%s %r' % (self.kind, self.key)
+
+
+class StartupProfiler(object):
+    
+    '''StartupProfiler collects L{ProfileRecord}s. It is thread-safe.'''
+    
+    def __init__(self):
+        self.records = []
+        self._local = threading.local()
+    
+    @contextmanager
+    def record(self, kind, key):
+        '''Context manager which profiles an operation.'''
+        active = self._local.__dict__.setdefault('active', [])
+        record = ProfileRecord(kind, key, _get_stack())
+        active.append(record)
+        
+        memory = _get_traced_memory()
+        start = time.time()
+        try:
+            yield record
+        finally:
+            record.time = time.time() - start
+            record.self_time = max(record.time - record._child_time, 0.0)
+            if memory is not None:
+                record.memory = _get_traced_memory() - memory
+            
+            active.pop()
+            if active:
+                active[-1]._child_time += record.time
+            self.records.append(record)
+    
+    def clear(self):
+        self.records = []
+    
+    def report(self, limit=None):
+        '''Return a text report of the records sorted by their total time.'''
+        records = sorted(self.records, key=lambda r: r.time, reverse=True)
+        if limit is not None:
+            records = records[:limit]
+        
+        lines = ['%10s %10s %12s  %s' % ('total ms', 'self ms', 'alloc bytes',
+                                         'operation (caller)')]
+        for record in records:
+            if record.memory is None:
+                memory = '-'
+            else:
+                memory = record.memory
+            
+            caller = record.stack and record.stack[-1] or '-'
+            lines.append('%10.3f %10.3f %12s  %s (%s)' % (
+                record.time * 1000, record.self_time * 1000, memory,
+                record.get_label(), caller))
+        return '\n'.join(lines)
+    
+    def get_collapsed(self):
+        '''Return the records as flamegraph-compatible collapsed stacks,
+        one line for each stack with its self time in microseconds.
+        '''
+        totals = {}
+        for record in self.records:
+            frames = record.stack + [record.get_label()]
+            stack = ';'.join(frame.replace(';', ',') for frame in frames)
+            totals[stack] = totals.get(stack, 0) + record.self_time
+        
+        lines = []
+        for stack, seconds in sorted(totals.iteritems()):
+            lines.append('%s %d' % (stack, round(seconds * 1000000)))
+        return '\n'.join(lines)
+    
+    def write_collapsed(self, path):
+        '''Write the collapsed stacks into a file.'''
+        f = open(path, 'w')
+        try:
+            f.write(self.get_collapsed())
+            f.write('\n')
+        finally:
+            f.close()
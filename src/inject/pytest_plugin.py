@@ -0,0 +1,57 @@
+'''pytest plugin which isolates tests sharing the registered injector.
+It takes a L{Snapshot <inject.testing.Snapshot>} before each test (before
+its fixtures), and restores it after the test teardown. Tests which have
+changed the configuration are listed in the terminal summary, including
+when they are run in pytest-xdist workers.
+
+Enable it in C{conftest.py}::
+    
+    pytest_plugins = ['inject.pytest_plugin']
+    
+    inject.create_lazy(config)
+
+'''
+import pytest
+
+from inject.testing import Snapshot
+
+
+_PROPERTY = 'inject_changes'
+_changed_tests = []
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    item._inject_snapshot = Snapshot()
+    yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    snapshot = getattr(item, '_inject_snapshot', None)
+    if snapshot is None:
+        return
+    
+    del item._inject_snapshot
+    changes = snapshot.restore()
+    if changes:
+        item.user_properties.append((_PROPERTY, changes))
+
+
+def pytest_runtest_logreport(report):
+    if report.when != 'teardown':
+        return
+    
+    for name, value in getattr(report, 'user_properties', ()):
+        if name == _PROPERTY:
+            _changed_tests.append((report.nodeid, value))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _changed_tests:
+        return
+    
+    terminalreporter.section('inject: tests which changed the injector')
+    for nodeid, changes in _changed_tests:
+        terminalreporter.write_line('%s: %s' % (nodeid, ', '.join(changes)))
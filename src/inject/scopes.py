@@ -17,8 +17,11 @@ to create a new object every time a binding is accessed.
 
 '''
 import logging
+import sys
 import threading
-from inject.exc import NoRequestError, FactoryNotCallable
+from inject.disposal import dispose_all
+from inject.exc import NoRequestError, FactoryNotCallable, FactoryTimeout
+from inject.pools import get_shared_pool, spawn
 
 
 class AbstractScope(object):
@@ -31,6 +34,21 @@ class AbstractScope(object):
           (see L{ThreadLocalBindings} for example).
         - Set the C{logger} class attribute to a specific logger instance.
     
+    An injector sets the C{listener} attribute of its scopes to a callable,
+    which is called with the scope and a type after the type has been bound,
+    or its factory has been bound. The injector uses it to invalidate its
+    resolution caches.
+    
+    The C{journal} attribute can be set to an object with a C{record(scope,
+    type)} method, which is called before a binding or a factory of a type is
+    changed, see L{inject.testing}. Instances which are created by factories
+    are not recorded.
+    
+    The C{local} attribute is true for scopes which store different
+    bindings for each thread or request. Subclasses can set it as a class
+    attribute, by default it is true when the bindings are a C{threading.local}
+    (i.e. L{ThreadLocalBindings}).
+    
     '''
     
     logger = None
@@ -38,23 +56,41 @@ class AbstractScope(object):
     def __init__(self, bindings):
         self._bindings = bindings
         self._factories = {}
+        self._per_process = set()
+        self._timeouts = {}
+        self._hung = {}
+        self.listener = None
+        self.journal = None
     
     def __contains__(self, type):
         return self.is_bound(type)
     
+    @property
+    def local(self):
+        return isinstance(self._bindings, threading.local)
+    
     def bind(self, type, to):
         '''Create a binding for a type, override an existing binding if present.
         '''
+        self._record(type)
         if self.is_bound(type):
             self.logger.info('Overriding an existing binding for %r.', type)
             self.unbind(type)
         
-        self._bindings[type] = to
-        self.logger.info('Bound %r to %r.', type, to)
+        self.bind_created(type, to)
+    
+    def bind_created(self, type, inst):
+        '''Bind an instance which has been created by a factory or by
+        autobinding. Unlike L{bind}, it is not recorded in the journal.
+        '''
+        self._bindings[type] = inst
+        self.logger.info('Bound %r to %r.', type, inst)
+        self._notify(type)
     
     def unbind(self, type):
         '''Unbind a binding for a type if it is preset, else do nothing.'''
         if type in self._bindings:
+            self._record(type)
             del self._bindings[type]
             self.logger.info('Unbound %r.', type)
     
@@ -66,7 +102,7 @@ class AbstractScope(object):
         '''
         return type in self._bindings
     
-    def bind_factory(self, type, factory):
+    def bind_factory(self, type, factory, per_process=False, timeout=None):
         '''Bind a factory for a type, which will be used to create an instance
         when a *not present* binding is accessed.
         
@@ -74,27 +110,111 @@ class AbstractScope(object):
         and RequestScope can have multiple bindings for each thread/request,
         but only one factory for a type. However, the factory is instantiated
         for each thread/request.
+        
+        @param per_process: If true, an instance created in a parent process
+            is dropped after a fork, and is lazily recreated in a child
+            (see L{after_fork}). Use it for objects which hold sockets,
+            connections, or locks.
+        @param timeout: If given, the factory is run in another thread
+            (see L{wrap}), and L{get} raises L{FactoryTimeout
+            <inject.exc.FactoryTimeout>} if it does not return within
+            timeout seconds. The hung factory is abandoned, not interrupted,
+            and no other thread is started for the type until it returns.
         '''
         if not callable(factory):
             raise FactoryNotCallable(factory)
         
+        self._record(type)
         if self.is_factory_bound(type):
             self.logger.info('Overriding an existing factory for %r.', type)
             self.unbind_factory(type)
         
         self._factories[type] = factory
+        if per_process:
+            self._per_process.add(type)
+        if timeout is not None:
+            self._timeouts[type] = timeout
         self.logger.info('Bound factory for %r to %r.', type, factory)
+        self._notify(type)
     
     def unbind_factory(self, type):
         '''Unbind a factory for a type if it is present, else do nothing.'''
         if type in self._factories:
+            self._record(type)
             del self._factories[type]
+            self._per_process.discard(type)
+            self._timeouts.pop(type, None)
+            self._hung.pop(type, None)
             self.logger.info('Unbound factory for %r.', type)
     
     def is_factory_bound(self, type):
         '''Return true if there is a bound factory for a given type.'''
         return type in self._factories
     
+    def _record(self, type):
+        '''Record a type in the journal, if any, before it is changed.'''
+        journal = self.journal
+        if journal is not None:
+            journal.record(self, type)
+    
+    def _notify(self, type):
+        '''Call the listener, if any, after a type has been bound.'''
+        listener = self.listener
+        if listener is not None:
+            listener(self, type)
+    
+    def get_state(self, type):
+        '''Return the binding and the factory of a type (in the current
+        thread/request for thread-local scopes), which can be restored
+        with L{set_state}.
+        '''
+        bindings = self._bindings
+        return (type in bindings, bindings.get(type),
+                self._factories.get(type), type in self._per_process,
+                self._timeouts.get(type))
+    
+    def set_state(self, type, state):
+        '''Restore the binding and the factory of a type returned by
+        L{get_state}, or remove them when the state is None.
+        '''
+        self._record(type)
+        bindings = self._bindings
+        if type in bindings:
+            del bindings[type]
+        self.unbind_factory(type)
+        if state is None:
+            return
+        
+        bound, to, factory, per_process, timeout = state
+        if factory is not None:
+            self.bind_factory(type, factory, per_process=per_process,
+                              timeout=timeout)
+        if bound:
+            bindings[type] = to
+            self._notify(type)
+    
+    def get_factory(self, type):
+        '''Return a bound factory for a given type or None.'''
+        return self._factories.get(type)
+    
+    def get_timeout(self, type):
+        '''Return a factory timeout for a given type or None.'''
+        return self._timeouts.get(type)
+    
+    def is_per_process(self, type):
+        '''Return true if a factory for a given type is per-process.'''
+        return type in self._per_process
+    
+    def factory_types(self):
+        '''Return a list of types which have bound factories.'''
+        return list(self._factories)
+    
+    def bound_types(self):
+        '''Return a list of bound types (in the current thread/request
+        for thread-local scopes).
+        '''
+        return list(self._bindings)
+    
     def get(self, type):
         '''Return a bound object for a given type, or instantiate and bind
         it using a factory if it is present, or return None.
@@ -103,10 +223,72 @@ class AbstractScope(object):
             return self._bindings.get(type)
         
         elif type in self._factories:
-            factory = self._factories[type]
-            inst = factory()
-            self.bind(type, inst)
+            inst = self._construct(type)
+            self.bind_created(type, inst)
             return inst
+    
+    def wrap(self, func):
+        '''Return a callable which runs a function in the current scope
+        context in any thread. The base implementation only carries
+        the current injector (see L{use_injector
+        <inject.injectors.use_injector>}), or returns the function itself.
+        '''
+        return _wrap_injector(func)
+    
+    def _construct(self, type):
+        '''Call a factory for a type, with a deadline if it has a timeout.
+        
+        A factory which has timed out is remembered as hung. The next
+        constructions of the type wait for it instead of starting new
+        threads, and start a new construction only after it has returned.
+        
+        @raise FactoryTimeout: if the factory has not returned in time.
+        '''
+        factory = self._factories[type]
+        timeout = self._timeouts.get(type)
+        if timeout is None:
+            return factory()
+        
+        future = self._spawn(type, factory, timeout)
+        return self._wait(type, future, timeout)
+    
+    def _spawn(self, type, factory, timeout):
+        '''Run a factory in a new thread and return its future. When
+        a previous call of the factory is hung, wait for it first.
+        
+        @raise FactoryTimeout: if the hung call has not returned in time.
+        '''
+        hung = self._hung.get(type)
+        if hung is not None:
+            if not hung.wait(timeout):
+                raise FactoryTimeout(type, timeout)
+            if self._hung.get(type) is hung:
+                del self._hung[type]
+        
+        return spawn(self.wrap(factory))
+    
+    def _wait(self, type, future, timeout):
+        '''Return the result of a factory future, remember the future
+        as hung when it has not returned in time.
+        
+        @raise FactoryTimeout: if the factory has not returned in time.
+        '''
+        if not future.wait(timeout):
+            self._hung[type] = future
+            self.logger.warning('Factory for %r has timed out after %ss.',
+                                type, timeout)
+            raise FactoryTimeout(type, timeout)
+        return future.result()
+    
+    def after_fork(self):
+        '''Drop the instances of per-process factories in a forked child
+        process. The instances are not disposed, because they are still
+        used by the parent.
+        '''
+        self._hung = {}
+        for type in self._per_process:
+            if type in self._bindings:
+                del self._bindings[type]
 
 
 class NoScope(AbstractScope):
@@ -130,8 +312,7 @@ class NoScope(AbstractScope):
             return self._bindings.get(type)
         
         elif type in self._factories:
-            factory = self._factories[type]
-            return factory()
+            return self._construct(type)
 
 
 class ApplicationScope(AbstractScope):
@@ -144,6 +325,15 @@ class ApplicationScope(AbstractScope):
     
     def __init__(self):
         super(ApplicationScope, self).__init__({})
+    
+    def copy(self):
+        '''Return a new scope with copies of the bindings and factories.'''
+        scope = self.__class__()
+        scope._bindings = dict(self._bindings)
+        scope._factories = dict(self._factories)
+        scope._per_process = set(self._per_process)
+        scope._timeouts = dict(self._timeouts)
+        return scope
 
 
 class ThreadLocalBindings(threading.local):
@@ -154,6 +344,7 @@ class ThreadLocalBindings(threading.local):
     
     def __init__(self):
         self._data = {}
+        self.caches = {}
     
     def __getitem__(self, key):
         return self._data[key]
@@ -167,6 +358,9 @@ class ThreadLocalBindings(threading.local):
     def __contains__(self, key):
         return key in self._data
     
+    def __iter__(self):
+        return iter(self._data)
+    
     def get(self, key):
         return self._data.get(key)
     
@@ -175,6 +369,7 @@ class ThreadLocalBindings(threading.local):
     
     def clear(self):
         self._data = {}
+        self.caches = {}
 
 
 class ThreadScope(AbstractScope):
@@ -184,27 +379,103 @@ class ThreadScope(AbstractScope):
     '''
     
     logger = logging.getLogger('inject.ThreadScope')
+    local = True
     
     def __init__(self):
         super(ThreadScope, self).__init__(ThreadLocalBindings())
+    
+    def after_fork(self):
+        '''Drop the bindings of the forking thread in a forked child process.
+        '''
+        self._bindings = ThreadLocalBindings()
+        self._hung = {}
+    
+    def clear(self):
+        '''Drop the bindings and caches of the current thread.'''
+        self._bindings.clear()
+    
+    def get_cache(self, owner):
+        '''Return a thread-local cache dict for an owner (usually a function).
+        
+        @see: L{inject.caching}.
+        '''
+        caches = self._bindings.caches
+        cache = caches.get(owner)
+        if cache is None:
+            cache = caches[owner] = {}
+        return cache
 
 
 class RequestLocalBindings(ThreadLocalBindings):
     
     '''RequestLocalBindings class subclasses L{ThreadLocalBindings} and can
     track whether a request has been started or not.
+    
+    The request bindings can be shared with other threads using L{snapshot}
+    and L{activate}. Shared bindings are copied on the first write, so that
+    threads do not see each other's changes. Caches and owned objects are
+    shared between the threads of a request.
     ''' 
     
     def __init__(self):
         super(RequestLocalBindings, self).__init__()
         self.request_started = False
+        self.owned = []
+        self._shared = False
+    
+    def __setitem__(self, key, value):
+        if self._shared:
+            self._unshare()
+        self._data[key] = value
+    
+    def __delitem__(self, key):
+        if self._shared:
+            self._unshare()
+        del self._data[key]
+    
+    def _unshare(self):
+        self._data = dict(self._data)
+        self._shared = False
     
     def start_request(self):
         self.request_started = True
+        self.owned = []
     
     def end_request(self):
+        '''End the request, clear the bindings and return a list of objects
+        owned by the request.
+        '''
+        owned = self.owned
         self.clear()
+        self.owned = []
         self.request_started = False
+        self._shared = False
+        return owned
+    
+    def snapshot(self):
+        '''Return a snapshot of the current request or None if no request.'''
+        if not self.request_started:
+            return None
+        
+        self._shared = True
+        return (self._data, self.caches, self.owned)
+    
+    def activate(self, snapshot):
+        '''Activate a request snapshot in the current thread, and return
+        the previous state which must be passed to L{restore}.
+        '''
+        previous = (self._data, self.caches, self.owned,
+                    self.request_started, self._shared)
+        
+        self._data, self.caches, self.owned = snapshot
+        self.request_started = True
+        self._shared = True
+        return previous
+    
+    def restore(self, previous):
+        '''Restore the state which has been returned by L{activate}.'''
+        (self._data, self.caches, self.owned,
+         self.request_started, self._shared) = previous
 
 
 class RequestScope(ThreadScope):
@@ -223,6 +494,23 @@ class RequestScope(ThreadScope):
     To use the scope start and end requests, usually using the C{with}
     statement, or C{try/finally}.
     
+    A scope created with C{dispose=True} owns objects which have been
+    created by its factories, and disposes them (see L{inject.disposal}) when
+    a request ends. Set C{reaper} to a L{Reaper <inject.disposal.Reaper>} to
+    dispose them in a background thread. Disposal is off by default, because
+    request factories can return shared objects, i.e. C{lambda: client}.
+    Explicitly bound objects are never disposed by the scope.
+    
+    Types, which are I/O-bound and independent, can be prefetched when
+    a request starts. Their factories are run concurrently in a thread pool,
+    and the instances are bound into the request before L{start} returns::
+        
+        scope.start(prefetch=[Session, FeatureFlags])
+    
+    Prefetched factories are run with the request bindings activated
+    (see L{wrap}), but the request-scoped objects which they create as their
+    own dependencies are not bound into the request.
+    
     WSGI example::
     
         @inject.param('scope', inject.reqscope)
@@ -244,10 +532,22 @@ class RequestScope(ThreadScope):
     
     logger = logging.getLogger('inject.RequestScope')
     
-    def __init__(self):
+    def __init__(self, dispose=False, reaper=None, pool=None):
+        '''Create a new request scope.
+        
+        @param dispose: Whether to dispose objects created by factories
+            when a request ends, the default is false.
+        @param reaper: An optional L{Reaper <inject.disposal.Reaper>},
+            which disposes the objects in a background thread.
+        @param pool: An optional L{ThreadPool <inject.pools.ThreadPool>}
+            for prefetching, the default is the shared pool.
+        '''
         # Calling super for ThreadScope because we need to call AbstractScope
         # constructor here.
         super(ThreadScope, self).__init__(RequestLocalBindings())
+        self.dispose = dispose
+        self.reaper = reaper
+        self.pool = pool
     
     def __enter__(self):
         self.start()
@@ -257,13 +557,45 @@ class RequestScope(ThreadScope):
         self.end()
         return False
     
-    def start(self):
-        '''Start a new request.'''
+    def after_fork(self):
+        '''Drop the request of the forking thread, and reset the reaper
+        and the pool in a forked child process.
+        '''
+        self._bindings = RequestLocalBindings()
+        self._hung = {}
+        if self.reaper is not None:
+            self.reaper.after_fork()
+        if self.pool is not None:
+            self.pool.after_fork()
+    
+    def start(self, prefetch=None):
+        '''Start a new request.
+        
+        @param prefetch: Types which factories are run concurrently,
+            and which instances are bound into the new request. Types without
+            factories in this scope are skipped.
+        '''
         self._bindings.start_request()
+        if prefetch:
+            self._prefetch(prefetch)
     
     def end(self):
-        '''End the request and clear the bindings.'''
-        self._bindings.end_request()
+        '''End the request, clear the bindings and dispose the objects
+        created by the factories.
+        '''
+        owned = self._bindings.end_request()
+        if not owned or not self.dispose:
+            return
+        
+        if self.reaper is not None:
+            self.reaper.put(owned)
+        else:
+            dispose_all(owned)
+    
+    def clear(self):
+        '''End the request in the current thread if it has been started.'''
+        if self._bindings.request_started:
+            self.end()
     
     def bind(self, type, to):
         '''Create a binding for a type, override an existing binding if present.
@@ -280,6 +612,15 @@ class RequestScope(ThreadScope):
         '''
         self._request_required()
         return super(RequestScope, self).unbind(type)
+    
+    def get_cache(self, owner):
+        '''Return a request-local cache dict for an owner, the cache is dropped
+        when the request ends.
+        
+        @raise NoRequestError: if no request.
+        '''
+        self._request_required()
+        return super(RequestScope, self).get_cache(owner)
 
     def get(self, type):
         '''Return a bound object for a given type, or instantiate and bind
@@ -288,7 +629,86 @@ class RequestScope(ThreadScope):
         @raise NoRequestError: if no request.
         '''
         self._request_required()
-        return super(RequestScope, self).get(type)
+        bindings = self._bindings
+        if type in bindings or type not in self._factories:
+            return bindings.get(type)
+        
+        inst = super(RequestScope, self).get(type)
+        if self.dispose:
+            bindings.owned.append(inst)
+        return inst
+    
+    def wrap(self, func):
+        '''Return a callable which runs a function in the current request
+        in any thread, or the function itself when there is no request.
+        
+        The wrapper activates a copy-on-write snapshot of the request
+        bindings for the duration of the call. Objects which are created
+        by factories inside the call are owned by the request.
+        '''
+        bindings = self._bindings
+        snapshot = bindings.snapshot()
+        if snapshot is None:
+            return _wrap_injector(func)
+        
+        def request_wrapper(*args, **kwargs):
+            previous = bindings.activate(snapshot)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                bindings.restore(previous)
+        
+        return _wrap_injector(request_wrapper)
+    
+    def _prefetch(self, types):
+        '''Run the factories for types concurrently, and bind the instances.
+        If any factory fails, end the request and reraise the first error.
+        
+        Factories with timeouts are run in their own threads (see
+        L{_construct}), so that hung factories do not occupy the pool.
+        '''
+        pool = self.pool
+        if pool is None:
+            pool = get_shared_pool()
+        
+        bindings = self._bindings
+        futures = []
+        exc_info = None
+        for type in types:
+            factory = self._factories.get(type)
+            if factory is None or type in bindings:
+                continue
+            
+            timeout = self._timeouts.get(type)
+            if timeout is None:
+                futures.append((type, pool.submit(self.wrap(factory))))
+                continue
+            
+            try:
+                futures.append((type, self._spawn(type, factory, timeout)))
+            except FactoryTimeout:
+                if exc_info is None:
+                    exc_info = sys.exc_info()
+        
+        for type, future in futures:
+            try:
+                timeout = self._timeouts.get(type)
+                if timeout is not None:
+                    inst = self._wait(type, future, timeout)
+                else:
+                    inst = future.result()
+            except Exception:
+                if exc_info is None:
+                    exc_info = sys.exc_info()
+                continue
+            
+            self.bind(type, inst)
+            if self.dispose:
+                bindings.owned.append(inst)
+        
+        if exc_info is not None:
+            self.end()
+            raise exc_info[0], exc_info[1], exc_info[2]
     
     def _request_required(self):
         '''Check whether a request has been started or raise an error.
@@ -299,6 +719,41 @@ class RequestScope(ThreadScope):
             raise NoRequestError()
 
 
+def scoped(scope_type):
+    '''Return a class decorator, which binds the class as a factory in
+    a scope when it is first autobound, and pins it to the scope
+    (see L{Injector.pin <inject.injectors.Injector.pin>}).
+    
+    Example::
+        
+        @scoped(RequestScope)
+        class Session(object):
+            pass
+    
+    '''
+    def decorator(klass):
+        klass.__inject_scope__ = scope_type
+        return klass
+    return decorator
+
+
+def _wrap_injector(func):
+    '''Return a callable which runs a function with the current injector
+    of this thread (see L{use_injector <inject.injectors.use_injector>}),
+    or the function itself when there is no current injector.
+    '''
+    from inject import injectors
+    injector = injectors._LOCAL.injector
+    if injector is None:
+        return func
+    
+    def injector_wrapper(*args, **kwargs):
+        with injectors.use_injector(injector):
+            return func(*args, **kwargs)
+    
+    return injector_wrapper
+
+
 '''
 @var appscope: ApplicationScope alias.
 @var noscope: NoScope alias.
@@ -0,0 +1,67 @@
+'''Injector statistics.
+An injector created with C{stats=True} counts the resolutions of each type,
+and measures the number and the total time of its constructions (factory
+invocations and autobinding). The counters are approximate when the injector
+is accessed from multiple threads.
+
+Factory timeouts (see L{FactoryTimeout <inject.exc.FactoryTimeout>}) are
+counted even when the injector does not collect stats.
+
+Example::
+    
+    injector = inject.create(stats=True)
+    ...
+    injector.stats.get(Database)
+    # {'resolutions': 120, 'constructions': 1, 'construction_time': 0.25,
+    #  'timeouts': 0}
+
+'''
+
+
+class InjectorStats(object):
+    
+    '''InjectorStats stores the per-type counters of an injector.'''
+    
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        '''Reset all counters.'''
+        self.resolutions = {}
+        self.constructions = {}
+        self.construction_time = {}
+        self.timeouts = {}
+    
+    def resolved(self, type):
+        '''Count a resolution of a type.'''
+        resolutions = self.resolutions
+        resolutions[type] = resolutions.get(type, 0) + 1
+    
+    def constructed(self, type, seconds):
+        '''Count a construction of a type which has taken seconds.'''
+        constructions = self.constructions
+        constructions[type] = constructions.get(type, 0) + 1
+        
+        times = self.construction_time
+        times[type] = times.get(type, 0.0) + seconds
+    
+    def timed_out(self, type):
+        '''Count a factory timeout of a type.'''
+        timeouts = self.timeouts
+        timeouts[type] = timeouts.get(type, 0) + 1
+    
+    def get(self, type):
+        '''Return a dict with the counters of a type.'''
+        return {'resolutions': self.resolutions.get(type, 0),
+                'constructions': self.constructions.get(type, 0),
+                'construction_time': self.construction_time.get(type, 0.0),
+                'timeouts': self.timeouts.get(type, 0)}
+    
+    def types(self):
+        '''Return a list of types which have any counters.'''
+        types = list(self.resolutions)
+        for counters in (self.constructions, self.timeouts):
+            for type in counters:
+                if type not in types:
+                    types.append(type)
+        return types
@@ -0,0 +1,156 @@
+'''Per-tenant injectors.
+L{TenantInjectors} builds an injector for each tenant on demand (usually
+a L{child <inject.injectors.Injector.child>} of the application injector),
+and keeps the most recently used ones in a bounded LRU cache. Injectors
+which are evicted (because the cache is full or they have been idle for too
+long) are disposed, see L{Injector.dispose
+<inject.injectors.Injector.dispose>}, so that the memory stays bounded
+however many tenants are served.
+
+Example::
+    
+    def create_tenant_injector(tenant):
+        child = injector.child()
+        child.bind(Settings, load_settings(tenant))
+        child.bind_factory(DbPool, lambda: DbPool(tenant.db_url))
+        return child
+    
+    tenants = TenantInjectors(create_tenant_injector, size=100, idle=600)
+    
+    tenants.get(tenant).get(DbPool)
+
+'''
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class TenantInjectors(object):
+    
+    '''TenantInjectors is an LRU cache of per-tenant injectors.
+    It is thread-safe.
+    '''
+    
+    logger = logging.getLogger('inject.TenantInjectors')
+    
+    def __init__(self, factory, size=100, idle=None):
+        '''Create a new tenant injectors cache.
+        
+        @param factory: A callable which takes a tenant key and returns
+            a new injector.
+        @param size: The maximum number of cached injectors.
+        @param idle: If given, injectors which have not been used for idle
+            seconds are evicted.
+        '''
+        self.factory = factory
+        self.size = size
+        self.idle = idle
+        self._entries = OrderedDict()
+        self._swept_at = time.time()
+        self._lock = threading.Lock()
+    
+    def __contains__(self, tenant):
+        return tenant in self._entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def tenants(self):
+        '''Return a list of the tenants which have cached injectors.'''
+        return list(self._entries)
+    
+    def get(self, tenant):
+        '''Return an injector for a tenant, create it if it is not cached.'''
+        now = time.time()
+        evicted = []
+        with self._lock:
+            if self.idle is not None and now - self._swept_at > self.idle:
+                evicted.extend(self._sweep(now))
+            
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                self._touch(tenant, entry, now)
+        
+        self._dispose(evicted)
+        if entry is not None:
+            return entry[0]
+        
+        injector = self.factory(tenant)
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                # Another thread has created an injector.
+                evicted = [(tenant, injector)]
+                self._touch(tenant, entry, now)
+            else:
+                entry = self._entries[tenant] = [injector, now]
+                evicted = self._shrink()
+                self.logger.info('Created an injector for tenant %r.', tenant)
+        
+        self._dispose(evicted)
+        return entry[0]
+    
+    def evict(self, tenant):
+        '''Evict and dispose a tenant injector if it is cached.'''
+        with self._lock:
+            entry = self._entries.pop(tenant, None)
+        
+        if entry is not None:
+            self._dispose([(tenant, entry[0])])
+    
+    def evict_idle(self):
+        '''Evict and dispose the idle injectors.'''
+        with self._lock:
+            evicted = self._sweep(time.time())
+        self._dispose(evicted)
+    
+    def clear(self):
+        '''Evict and dispose all injectors.'''
+        with self._lock:
+            entries = self._entries
+            self._entries = OrderedDict()
+        
+        self._dispose([(tenant, entry[0])
+                       for tenant, entry in entries.iteritems()])
+    
+    def _touch(self, tenant, entry, now):
+        '''Move an entry to the end, as the most recently used.'''
+        entries = self._entries
+        del entries[tenant]
+        entries[tenant] = entry
+        entry[1] = now
+    
+    def _shrink(self):
+        '''Remove the least recently used entries above the size,
+        return a list of (tenant, injector) tuples.
+        '''
+        entries = self._entries
+        evicted = []
+        while len(entries) > self.size:
+            tenant, entry = entries.popitem(last=False)
+            evicted.append((tenant, entry[0]))
+        return evicted
+    
+    def _sweep(self, now):
+        '''Remove the idle entries from the least recently used end,
+        return a list of (tenant, injector) tuples.
+        '''
+        self._swept_at = now
+        deadline = now - self.idle
+        entries = self._entries
+        evicted = []
+        while entries:
+            tenant = next(iter(entries))
+            entry = entries[tenant]
+            if entry[1] >= deadline:
+                break
+            
+            del entries[tenant]
+            evicted.append((tenant, entry[0]))
+        return evicted
+    
+    def _dispose(self, evicted):
+        for tenant, injector in evicted:
+            injector.dispose()
+            self.logger.info('Evicted the injector of tenant %r.', tenant)
@@ -0,0 +1,163 @@
+'''Test isolation of the registered injector.
+L{Snapshot} records the state of the registered injector before a test,
+and restores it afterwards, so that tests can share one configured injector
+instead of creating and configuring a new one for each test.
+
+A snapshot does not copy the bindings. It attaches a L{Journal} to
+the application scopes (and other scopes which are not thread-local), which
+records the previous binding and factory of a type before it is changed
+for the first time. Restoring is proportional to the number of the changed
+types. Instances which have been created by factories and by autobinding are
+not recorded, they stay cached as in production.
+
+When the registered injector is a L{LazyInjector
+<inject.injectors.LazyInjector>}, the snapshot creates and configures
+the real injector first, so that it is configured only once for all tests.
+
+L{Snapshot.restore} also:
+    
+    - restores the registered injector, if a test has registered another
+      one, or has unregistered it,
+    - restores the stack of scopes, if a test has bound or unbound scopes
+      or has run a L{transaction <inject.injectors.Injector.transaction>},
+    - clears the thread scope bindings and ends the request of the current
+      thread, see L{ThreadScope.clear <inject.scopes.ThreadScope.clear>},
+    - clears the injector resolution caches.
+
+It returns a list of the changes, so that tests which mutate the global
+configuration can be found. See L{inject.pytest_plugin} for the pytest
+integration.
+
+Example::
+    
+    class MyTestCase(unittest.TestCase):
+        
+        def setUp(self):
+            self.snapshot = Snapshot()
+        
+        def tearDown(self):
+            self.snapshot.restore()
+
+'''
+from inject import injectors
+from inject.graph import get_type_name
+from inject.scopes import AbstractScope
+
+
+class Journal(object):
+    
+    '''Journal records the previous states of changed types in scopes,
+    see L{AbstractScope.get_state <inject.scopes.AbstractScope.get_state>}.
+    '''
+    
+    def __init__(self):
+        self.states = {}
+        self.order = []
+    
+    def record(self, scope, type):
+        '''Record the state of a type in a scope, if it is the first change.
+        '''
+        key = (scope, type)
+        if key in self.states:
+            return
+        
+        self.states[key] = scope.get_state(type)
+        self.order.append(key)
+    
+    def get_changed(self):
+        '''Return a list of (scope, type) tuples which states differ from
+        the recorded ones.
+        '''
+        return [(scope, type) for scope, type in self.order
+                if scope.get_state(type) != self.states[(scope, type)]]
+    
+    def rollback(self):
+        '''Restore the recorded states in the reversed order, return a list
+        of the changed (scope, type) tuples.
+        '''
+        changed = self.get_changed()
+        for scope, type in reversed(changed):
+            scope.set_state(type, self.states[(scope, type)])
+        
+        self.states = {}
+        self.order = []
+        return changed
+
+
+class Snapshot(object):
+    
+    '''Snapshot of the registered injector state, see the module
+    documentation.
+    '''
+    
+    def __init__(self):
+        injector = injectors._INJECTOR
+        if isinstance(injector, injectors.LazyInjector):
+            injector = injector._init_real_injector()
+        
+        self.injector = injector
+        self.journal = Journal()
+        self._journals = []
+        self._scopes = None
+        self._scopes_stack = None
+        self._app_scope = None
+        self._pins = None
+        
+        injector = self.injector
+        if not isinstance(injector, injectors.Injector):
+            return
+        
+        self._scopes = dict(injector._scopes)
+        self._scopes_stack = list(injector._scopes_stack)
+        self._app_scope = injector._app_scope
+        self._pins = dict(injector._pins)
+        for scope in self._scopes_stack:
+            if isinstance(scope, AbstractScope) and not scope.local:
+                self._journals.append((scope, scope.journal))
+                scope.journal = self.journal
+    
+    def restore(self):
+        '''Restore the injector state, return a list of changes (descriptions
+        of the changed types, scopes and registration).
+        '''
+        for scope, journal in self._journals:
+            scope.journal = journal
+        self._journals = []
+        
+        changes = []
+        for scope, type in self.journal.rollback():
+            changes.append(get_type_name(type))
+        
+        injector = self.injector
+        if self._scopes_stack is not None:
+            if injector._scopes_stack != self._scopes_stack:
+                self._restore_scopes()
+                changes.append('scopes')
+            
+            for scope in injector._scopes_stack:
+                clear = getattr(scope, 'clear', None)
+                if getattr(scope, 'local', False) and clear is not None:
+                    clear()
+            injector._pins = dict(self._pins)
+            injector._update_local_scopes()
+        
+        if injectors._INJECTOR is not injector:
+            injectors.unregister()
+            if injector is not None:
+                injectors.register(injector)
+            changes.append('registered injector')
+        
+        return changes
+    
+    def _restore_scopes(self):
+        injector = self.injector
+        for scope in injector._scopes_stack:
+            if isinstance(scope, AbstractScope):
+                scope.listener = None
+        
+        injector._scopes = dict(self._scopes)
+        injector._scopes_stack = list(self._scopes_stack)
+        injector._app_scope = self._app_scope
+        for scope in injector._scopes_stack:
+            if isinstance(scope, AbstractScope):
+                scope.listener = injector._on_scope_change
@@ -0,0 +1,111 @@
+'''Sampling tracer of dependency resolutions.
+L{SamplingTracer} records one in N L{Injector.get
+<inject.injectors.Injector.get>} calls into a ring buffer, so that production
+resolution profiles can be collected at a bounded cost. Each sample is a dict
+with the resolved C{type}, the C{scope} class name which has served it
+(None when the type has been autobound or not found), C{created} (C{'factory'}
+or C{'autobind'} when an instance has been created, else None),
+the C{latency} in seconds, and the C{caller} frame outside C{inject}.
+
+Resolutions which are nested inside a sampled one (i.e. dependencies
+created by its factory) are not sampled.
+
+Example::
+    
+    injector.tracer = SamplingTracer(every=1000, size=500)
+    
+    # Later, i.e. in a signal handler or a debug view.
+    injector.tracer.write(sys.stderr)
+
+'''
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+
+_INJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _get_caller():
+    '''Return the first frame outside C{inject} as a string.'''
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if os.path.dirname(os.path.abspath(filename)) != _INJECT_DIR:
+            return '%s (%s:%s)' % (code.co_name, filename, frame.f_lineno)
+        frame = frame.f_back
+
+
+class SamplingTracer(object):
+    
+    '''SamplingTracer stores every Nth resolution in a ring buffer.'''
+    
+    def __init__(self, every=100, size=1000):
+        '''Create a new tracer.
+        
+        @param every: Sample one in C{every} resolutions.
+        @param size: The maximum number of the stored samples.
+        '''
+        self.every = every
+        self.samples = deque(maxlen=size)
+        self._countdown = every
+        self._local = threading.local()
+    
+    def should_sample(self):
+        '''Return true if the next resolution must be sampled. It is called
+        for every resolution.
+        '''
+        if getattr(self._local, 'active', False):
+            return False
+        
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        
+        self._countdown = self.every
+        return True
+    
+    def trace(self, injector, type, none):
+        '''Resolve a type using an injector and record a sample.'''
+        scope, created = injector.get_resolution(type)
+        caller = _get_caller()
+        
+        local = self._local
+        local.active = True
+        start = time.time()
+        try:
+            return injector.get(type, none=none)
+        finally:
+            latency = time.time() - start
+            local.active = False
+            
+            if scope is not None:
+                scope = scope.__class__.__name__
+            self.samples.append({'type': type, 'scope': scope,
+                                 'created': created, 'latency': latency,
+                                 'caller': caller})
+    
+    def dump(self):
+        '''Return a list of the stored samples, the oldest first.'''
+        return list(self.samples)
+    
+    def clear(self):
+        self.samples.clear()
+    
+    def format(self):
+        '''Return the stored samples as text.'''
+        lines = ['%12s %18s %9s  %s' % ('latency us', 'scope', 'created',
+                                        'type (caller)')]
+        for sample in self.dump():
+            lines.append('%12.3f %18s %9s  %r (%s)' % (
+                sample['latency'] * 1000000, sample['scope'] or '-',
+                sample['created'] or '-', sample['type'], sample['caller']))
+        return '\n'.join(lines)
+    
+    def write(self, f):
+        '''Write the stored samples as text into a file object.'''
+        f.write(self.format())
+        f.write('\n')
@@ -53,3 +53,10 @@ def get_attrname_by_value(obj, attrvalue):
     
     raise NoAttrFound('Can\'t find an attribute in %r with the value %r.'
                       % (obj, attrvalue))
+
+
+def get_class_key(klass):
+    '''Return a key which identifies a class between processes,
+    i.e. C{module.Class}.
+    '''
+    return '%s.%s' % (klass.__module__, klass.__name__)
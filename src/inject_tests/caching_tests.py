@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+import inject
+from inject.exc import NoRequestError
+from inject.injectors import Injector
+from inject.scopes import RequestScope
+
+
+class CachedTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = Injector()
+        self.injector.register()
+        self.calls = []
+    
+    def tearDown(self):
+        self.injector.unregister()
+    
+    def testRequestCached(self):
+        '''request_cached should memoize results in the request.'''
+        @inject.request_cached
+        def func(a, b=None):
+            self.calls.append((a, b))
+            return object()
+        
+        scope = self.injector.get(RequestScope)
+        with scope:
+            r = func(1)
+            self.assertTrue(func(1) is r)
+            self.assertTrue(func(1, b=2) is not r)
+            self.assertTrue(func(1, b=2) is func(1, b=2))
+        
+        with scope:
+            self.assertTrue(func(1) is not r)
+        
+        self.assertEqual(self.calls, [(1, None), (1, 2), (1, None)])
+        self.assertEqual(func.cache_info(), {'hits': 3, 'misses': 3})
+    
+    def testRequestCachedNoRequest(self):
+        @inject.request_cached
+        def func():
+            pass
+        
+        self.assertRaises(NoRequestError, func)
+    
+    def testThreadCached(self):
+        '''thread_cached should memoize results in the current thread.'''
+        @inject.thread_cached
+        def func():
+            return object()
+        
+        r = func()
+        self.assertTrue(func() is r)
+        
+        results = []
+        thread = threading.Thread(target=lambda: results.append(func()))
+        thread.start()
+        thread.join()
+        
+        self.assertTrue(results[0] is not r)
+        self.assertEqual(func.cache_info(), {'hits': 1, 'misses': 2})
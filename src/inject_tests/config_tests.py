@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from inject.config import ConfigReloader, configure, load
+from inject.injectors import Injector, get_instance
+from inject.scopes import RequestScope
+from inject_tests.fixtures.lazy import A
+from inject_tests.fixtures.services import Backend
+
+
+class ConfigTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'bindings.json')
+    
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+    
+    def write(self, bindings, mtime=None):
+        f = open(self.path, 'w')
+        try:
+            json.dump({'bindings': bindings}, f)
+        finally:
+            f.close()
+        
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+    
+    def testConfigure(self):
+        self.write([
+            {'key': 'timeout', 'value': 5},
+            {'type': 'inject_tests.fixtures.lazy.A', 'value': 'a'},
+            {'key': 'backend',
+             'factory': 'inject_tests.fixtures.services.Backend',
+             'kwargs': {'url': 'redis://'}}])
+        
+        injector = Injector()
+        configure(injector, load(self.path))
+        
+        self.assertEqual(injector.get('timeout'), 5)
+        self.assertEqual(injector.get(A), 'a')
+        self.assertFalse(injector.is_bound('backend'))
+        
+        backend = injector.get('backend')
+        self.assertTrue(isinstance(backend, Backend))
+        self.assertEqual(backend.url, 'redis://')
+    
+    def testManifest(self):
+        '''Manifest targets should be imported on the first get.'''
+        module = 'inject_tests.fixtures.manifest'
+        sys.modules.pop(module, None)
+        
+        injector = Injector()
+        configure(injector, [
+            {'type': 'inject_tests.fixtures.lazy.A',
+             'target': module + '.Service', 'factory': True},
+            {'key': 'service', 'target': module + '.Service',
+             'factory': True, 'scope': 'request'},
+            {'key': 'templates', 'target': module + '.TEMPLATES'}])
+        self.assertFalse(module in sys.modules)
+        
+        service = injector.get(A)
+        self.assertTrue(module in sys.modules)
+        
+        from inject_tests.fixtures.manifest import Service, TEMPLATES
+        self.assertTrue(isinstance(service, Service))
+        self.assertTrue(injector.get(A) is service)
+        self.assertTrue(injector.get('templates') is TEMPLATES)
+        
+        reqscope = injector.get(RequestScope)
+        self.assertTrue(reqscope.is_factory_bound('service'))
+        with reqscope:
+            self.assertTrue(isinstance(injector.get('service'), Service))
+    
+    def testManifestUnknownScope(self):
+        entry = {'key': 'a', 'target': 'inject_tests.fixtures.lazy.A'}
+        
+        configure(Injector(), [entry])
+        self.assertRaises(ValueError, configure, Injector(),
+                          [dict(entry, scope='unknown')])
+        self.assertRaises(ValueError, configure, Injector(),
+                          [dict(entry, scope='noscope')])
+    
+    def testManifestFactoryFlag(self):
+        entry = {'key': 'a', 'target': 'inject_tests.fixtures.lazy.A'}
+        
+        path = 'inject_tests.fixtures.lazy.A'
+        self.assertRaises(ValueError, configure, Injector(),
+                          [dict(entry, factory=path)])
+        self.assertRaises(ValueError, configure, Injector(),
+                          [dict(entry, factory=1)])
+    
+    def testConfigureInvalid(self):
+        self.assertRaises(ValueError, configure, Injector(), [{'key': 'a'}])
+    
+    def testReloader(self):
+        injector = Injector()
+        injector.bind('shared', 'value')
+        self.write([{'key': 'timeout', 'value': 5}], mtime=1000)
+        
+        reloader = ConfigReloader(injector, self.path)
+        first = reloader.load()
+        self.assertEqual(reloader.version, 1)
+        self.assertFalse(reloader.check())
+        
+        with reloader.pin() as snapshot:
+            self.assertTrue(snapshot is first)
+            self.assertEqual(get_instance('timeout'), 5)
+            self.assertEqual(get_instance('shared'), 'value')
+            
+            self.write([{'key': 'timeout', 'value': 10}], mtime=2000)
+            self.assertTrue(reloader.check())
+            self.assertEqual(get_instance('timeout'), 5)
+        
+        with reloader.pin():
+            self.assertEqual(get_instance('timeout'), 10)
+        self.assertEqual(reloader.current.config_version, 2)
+    
+    def testReloaderInjections(self):
+        '''ConfigReloader should resolve factory injections from
+        the snapshot.
+        '''
+        self.write([{'key': 'api.timeout', 'value': 5},
+                    {'key': 'client',
+                     'factory': 'inject_tests.fixtures.services.Client'}])
+        reloader = ConfigReloader(Injector(), self.path)
+        snapshot = reloader.load()
+        
+        self.assertTrue(snapshot.is_bound('client'))
+        self.assertEqual(snapshot.get('client').timeout, 5)
+    
+    def testReloaderDispose(self):
+        '''ConfigReloader should dispose a replaced snapshot when it is
+        not pinned.
+        '''
+        self.write([{'key': 'backend',
+                     'factory': 'inject_tests.fixtures.services.Backend'}],
+                   mtime=1000)
+        reloader = ConfigReloader(Injector(), self.path)
+        reloader.load()
+        
+        with reloader.pin() as snapshot:
+            backend = snapshot.get('backend')
+            with reloader.pin():
+                reloader.load()
+            self.assertFalse(backend.closed)
+        self.assertTrue(backend.closed)
+        
+        backend = reloader.current.get('backend')
+        reloader.load()
+        self.assertTrue(backend.closed)
+        self.assertFalse(reloader.current.get('backend').closed)
+    
+    def testReloadError(self):
+        '''ConfigReloader should keep the current snapshot on errors.'''
+        self.write([{'key': 'timeout', 'value': 5}], mtime=1000)
+        reloader = ConfigReloader(Injector(), self.path)
+        snapshot = reloader.load()
+        
+        self.write([{'key': 'timeout', 'factory': 'no.such.factory'}],
+                   mtime=2000)
+        self.assertFalse(reloader.check())
+        self.assertTrue(reloader.current is snapshot)
+        self.assertEqual(reloader.version, 1)
+    
+    def testStart(self):
+        self.write([{'key': 'timeout', 'value': 5}], mtime=1000)
+        reloader = ConfigReloader(Injector(), self.path, interval=0.01)
+        reloader.load()
+        reloader.start()
+        try:
+            self.write([{'key': 'timeout', 'value': 10}], mtime=2000)
+            for i in range(100):
+                if reloader.version == 2:
+                    break
+                time.sleep(0.01)
+        finally:
+            reloader.stop()
+        
+        self.assertEqual(reloader.current.get('timeout'), 10)
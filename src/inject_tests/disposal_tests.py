@@ -0,0 +1,66 @@
+import unittest
+
+from inject.disposal import dispose, dispose_all, Reaper
+
+
+class Closeable(object):
+    
+    def __init__(self, log=None):
+        self.log = log if log is not None else []
+    
+    def close(self):
+        self.log.append(self)
+
+
+class DisposeTestCase(unittest.TestCase):
+    
+    def testClose(self):
+        obj = Closeable()
+        dispose(obj)
+        self.assertEqual(obj.log, [obj])
+    
+    def testNoExit(self):
+        '''Dispose should not call __exit__ of objects which have not been
+        entered.
+        '''
+        class A(object):
+            args = None
+            def __exit__(self, *args):
+                self.args = args
+        
+        a = A()
+        dispose(a)
+        self.assertTrue(a.args is None)
+    
+    def testNoDisposalMethods(self):
+        dispose(object())
+    
+    def testErrorsAreLogged(self):
+        '''Dispose should not propagate errors.'''
+        class A(object):
+            def close(self):
+                raise ValueError()
+        
+        dispose(A())
+    
+    def testDisposeAllReversed(self):
+        log = []
+        a = Closeable(log)
+        b = Closeable(log)
+        
+        dispose_all([a, b])
+        self.assertEqual(log, [b, a])
+
+
+class ReaperTestCase(unittest.TestCase):
+    
+    def testPut(self):
+        log = []
+        a = Closeable(log)
+        b = Closeable(log)
+        
+        reaper = Reaper()
+        reaper.put([a, b])
+        reaper.join()
+        
+        self.assertEqual(log, [b, a])
@@ -0,0 +1,103 @@
+import unittest
+
+import inject
+from inject.executors import RequestExecutor
+from inject.exc import NoRequestError
+from inject.injectors import Injector
+from inject.pools import ThreadPool
+from inject.scopes import RequestScope
+
+
+class A(object):
+    
+    pass
+
+
+class RequestExecutorTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = Injector()
+        self.injector.register()
+        self.scope = self.injector.get(RequestScope)
+        self.pool = ThreadPool(1)
+    
+    def tearDown(self):
+        self.pool.shutdown()
+        self.injector.unregister()
+    
+    def testSubmit(self):
+        '''RequestExecutor should run tasks in the submitting request.'''
+        @inject.param('a', A)
+        def func(a):
+            return a
+        
+        executor = RequestExecutor(self.pool)
+        a = A()
+        with self.scope:
+            self.scope.bind(A, a)
+            self.assertTrue(executor.submit(func).result() is a)
+        
+        # The worker does not keep the request.
+        self.assertRaises(NoRequestError,
+                          self.pool.submit(self.scope.get, A).result)
+    
+    def testUseInjector(self):
+        '''RequestExecutor should run tasks with the current injector.'''
+        self.injector.bind('key', 'registered')
+        child = self.injector.child()
+        child.bind('key', 'child')
+        
+        executor = RequestExecutor(self.pool)
+        with inject.use_injector(child):
+            with self.scope:
+                future = executor.submit(inject.get_instance, 'key')
+                self.assertEqual(future.result(), 'child')
+            
+            future = executor.submit(inject.get_instance, 'key')
+            self.assertEqual(future.result(), 'child')
+        
+        future = self.pool.submit(inject.get_instance, 'key')
+        self.assertEqual(future.result(), 'registered')
+    
+    def testNoRequest(self):
+        executor = RequestExecutor(self.pool)
+        future = executor.submit(self.scope.get, A)
+        self.assertRaises(NoRequestError, future.result)
+    
+    def testCopyOnWrite(self):
+        '''Workers and the request should not see each other's changes.'''
+        scope = self.scope
+        a = A()
+        
+        def func():
+            self.assertTrue(scope.get(A) is a)
+            scope.bind('worker', 1)
+            return scope.is_bound('worker')
+        
+        executor = RequestExecutor(self.pool, scope)
+        with scope:
+            scope.bind(A, a)
+            future = executor.submit(func)
+            scope.bind('request', 2)
+            
+            self.assertTrue(future.result())
+            self.assertFalse(scope.is_bound('worker'))
+            self.assertTrue(scope.is_bound('request'))
+    
+    def testOwnedObjects(self):
+        '''Objects created in workers should be owned by the request.'''
+        class B(object):
+            closed = False
+            def close(self):
+                self.closed = True
+        
+        scope = RequestScope(dispose=True)
+        self.injector.bind_scope(RequestScope, scope)
+        scope.bind_factory(B, B)
+        
+        executor = RequestExecutor(self.pool)
+        with scope:
+            b = executor.submit(scope.get, B).result()
+            self.assertFalse(b.closed)
+        
+        self.assertTrue(b.closed)
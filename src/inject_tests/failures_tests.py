@@ -0,0 +1,145 @@
+import time
+import unittest
+
+from inject.exc import AutobindingFailed, BackoffError, NoRequestError
+from inject.failures import Backoff, FailureCache
+from inject.injectors import Injector
+from inject.scopes import RequestScope
+
+
+class BackoffTestCase(unittest.TestCase):
+    
+    def testGetDelay(self):
+        backoff = Backoff(initial=1, maximum=5, multiplier=2)
+        delays = [backoff.get_delay(count) for count in range(1, 6)]
+        self.assertEqual(delays, [1, 2, 4, 5, 5])
+    
+    def testThreshold(self):
+        backoff = Backoff(initial=1, threshold=3)
+        self.assertEqual(backoff.get_delay(2), 0)
+        self.assertEqual(backoff.get_delay(3), 1)
+
+
+class FailureCacheTestCase(unittest.TestCase):
+    
+    def testFailed(self):
+        cache = FailureCache(Backoff(initial=10))
+        cache.check('key')
+        
+        error = ValueError()
+        cache.failed('key', error)
+        cache.failed('key', error)
+        self.assertRaises(BackoffError, cache.check, 'key')
+        
+        failure = cache.get('key')
+        self.assertEqual(failure.count, 2)
+        self.assertTrue(failure.error is error)
+        self.assertAlmostEqual(failure.retry_at - failure.failed_at, 20)
+        self.assertEqual(cache.get_failures(), {'key': failure})
+    
+    def testSucceeded(self):
+        cache = FailureCache(Backoff())
+        cache.failed('key', ValueError())
+        cache.succeeded('key')
+        
+        cache.check('key')
+        self.assertTrue(cache.get('key') is None)
+    
+    def testClear(self):
+        cache = FailureCache(Backoff())
+        cache.failed('key', ValueError())
+        cache.failed('key2', ValueError())
+        
+        cache.clear('key')
+        self.assertEqual(list(cache.get_failures()), ['key2'])
+        
+        cache.clear()
+        self.assertEqual(cache.get_failures(), {})
+
+
+class InjectorFailuresTestCase(unittest.TestCase):
+    
+    def testFactory(self):
+        '''Injector should fail fast after a factory failure.'''
+        calls = []
+        def factory():
+            calls.append(True)
+            raise ValueError()
+        
+        injector = Injector(backoff=Backoff(initial=0.05))
+        injector.bind_factory('key', factory)
+        
+        self.assertRaises(ValueError, injector.get, 'key')
+        self.assertRaises(BackoffError, injector.get, 'key')
+        self.assertEqual(len(calls), 1)
+        
+        time.sleep(0.06)
+        self.assertRaises(ValueError, injector.get, 'key')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(injector.failures.get('key').count, 2)
+    
+    def testAutobind(self):
+        class A(object):
+            fail = True
+            def __init__(self):
+                if self.fail:
+                    raise ValueError()
+        
+        injector = Injector(backoff=Backoff(initial=0.05))
+        self.assertRaises(AutobindingFailed, injector.get, A)
+        self.assertRaises(BackoffError, injector.get, A)
+        
+        A.fail = False
+        time.sleep(0.06)
+        self.assertTrue(isinstance(injector.get(A), A))
+        self.assertEqual(injector.failures.get_failures(), {})
+    
+    def testNoRequest(self):
+        '''Injector should not back off a type which is resolved outside
+        of a request.
+        '''
+        class A(object): pass
+        class B(object):
+            def __init__(self):
+                self.a = injector.get(A)
+        
+        injector = Injector(backoff=Backoff(initial=10))
+        reqscope = injector.get(RequestScope)
+        reqscope.bind_factory(A, A)
+        
+        self.assertRaises(NoRequestError, injector.get, A)
+        self.assertRaises(AutobindingFailed, injector.get, B)
+        self.assertEqual(injector.failures.get_failures(), {})
+        
+        with reqscope:
+            self.assertTrue(isinstance(injector.get(A), A))
+            self.assertTrue(isinstance(injector.get(B), B))
+    
+    def testDependencyBackoff(self):
+        '''Injector should not back off a type when its dependency
+        is in a backoff.
+        '''
+        def create_a():
+            raise ValueError()
+        
+        def create_b():
+            return injector.get('a')
+        
+        injector = Injector(backoff=Backoff(initial=10))
+        injector.bind_factory('a', create_a)
+        injector.bind_factory('b', create_b)
+        
+        self.assertRaises(ValueError, injector.get, 'a')
+        self.assertRaises(BackoffError, injector.get, 'b')
+        self.assertEqual(list(injector.failures.get_failures()), ['a'])
+    
+    def testNoBackoff(self):
+        def factory():
+            raise ValueError()
+        
+        injector = Injector()
+        injector.bind_factory('key', factory)
+        
+        self.assertTrue(injector.failures is None)
+        self.assertRaises(ValueError, injector.get, 'key')
+        self.assertRaises(ValueError, injector.get, 'key')
@@ -0,0 +1,9 @@
+'''Manifest targets, this module must be imported only by manifest tests.'''
+
+
+class Service(object):
+    
+    pass
+
+
+TEMPLATES = {'index': 'index.html'}
@@ -0,0 +1,21 @@
+
+
+import inject
+
+
+class Backend(object):
+    
+    closed = False
+    
+    def __init__(self, url=None):
+        self.url = url
+    
+    def close(self):
+        self.closed = True
+
+
+class Client(object):
+    
+    @inject.param('timeout', 'api.timeout')
+    def __init__(self, timeout):
+        self.timeout = timeout
@@ -0,0 +1,84 @@
+import os
+import unittest
+
+import inject.injectors
+from inject import forks
+from inject.injectors import Injector
+from inject.scopes import ThreadScope, RequestScope
+
+
+class A(object):
+    
+    pass
+
+
+class AfterForkTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = Injector()
+        self.injector.register()
+    
+    def tearDown(self):
+        self.injector.unregister()
+    
+    def testPerProcessFactories(self):
+        '''after_fork should drop the instances of per-process factories.'''
+        class B(object): pass
+        injector = self.injector
+        injector.bind_factory(A, A, per_process=True)
+        injector.bind_factory(B, B)
+        
+        a = injector.get(A)
+        b = injector.get(B)
+        forks.after_fork()
+        
+        self.assertTrue(injector.is_factory_bound(A))
+        self.assertFalse(injector.is_bound(A))
+        self.assertTrue(injector.get(A) is not a)
+        self.assertTrue(injector.get(B) is b)
+    
+    def testThreadAndRequestScopes(self):
+        injector = self.injector
+        threadscope = injector.get(ThreadScope)
+        reqscope = injector.get(RequestScope)
+        
+        threadscope.bind(A, A())
+        reqscope.start()
+        reqscope.bind(A, A())
+        
+        forks.after_fork()
+        self.assertFalse(threadscope.is_bound(A))
+        self.assertFalse(reqscope.is_bound(A))
+        self.assertFalse(reqscope._bindings.request_started)
+    
+    def testLocks(self):
+        lock = inject.injectors._REG_LOCK
+        forks.after_fork()
+        self.assertTrue(inject.injectors._REG_LOCK is not lock)
+    
+    def testCheckFork(self):
+        '''check_fork should reset the state in a forked process.'''
+        self.assertFalse(forks.check_fork())
+        
+        self.injector.bind_factory(A, A, per_process=True)
+        self.injector.get(A)
+        
+        pid = os.fork()
+        if pid == 0:
+            ok = forks.check_fork() and not self.injector.is_bound(A)
+            os._exit(int(not ok))
+        
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertTrue(self.injector.is_bound(A))
+
+
+class MemoryUsageTestCase(unittest.TestCase):
+    
+    def testMemoryUsage(self):
+        usage = forks.memory_usage()
+        if usage is None:
+            return # No /proc.
+        
+        self.assertTrue(usage['rss'] > 0)
+        self.assertTrue(usage['shared'] + usage['private'] <= usage['rss'])
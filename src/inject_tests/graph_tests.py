@@ -0,0 +1,115 @@
+import json
+import unittest
+
+import inject
+from inject.graph import DependencyGraph, get_dependencies, get_type_name, \
+    export, to_json, to_dot
+from inject.injectors import Injector
+
+
+class A(object): pass
+class B(object): pass
+class C(object): pass
+
+
+class GetDependenciesTestCase(unittest.TestCase):
+    
+    def testClass(self):
+        '''get_dependencies should find class injections.'''
+        class Base(object):
+            a = inject.attr(A)
+        
+        class D(Base):
+            b = inject.class_attr(B)
+            a2 = inject.named_attr('a2', A)
+            
+            @inject.param('c', C)
+            def __init__(self, c):
+                pass
+        
+        deps = get_dependencies(D)
+        self.assertEqual(set(deps), set([A, B, C]))
+        self.assertEqual(len(deps), 3)
+    
+    def testFunction(self):
+        @inject.param('a', A)
+        @inject.param('b', B)
+        def factory(a, b):
+            pass
+        
+        self.assertEqual(set(get_dependencies(factory)), set([A, B]))
+    
+    def testNoDependencies(self):
+        self.assertEqual(get_dependencies(A), [])
+        self.assertEqual(get_dependencies(lambda: None), [])
+
+
+class DependencyGraphTestCase(unittest.TestCase):
+    
+    def testToposort(self):
+        graph = DependencyGraph()
+        graph.add(A, [B, 'not_a_node'])
+        graph.add(B, [C])
+        graph.add(C)
+        
+        self.assertEqual(graph.toposort(), [C, B, A])
+        self.assertEqual(graph.get_dependents(), {B: [A], C: [B]})
+    
+    def testCycles(self):
+        graph = DependencyGraph()
+        graph.add(A, [B])
+        graph.add(B, [A])
+        graph.add(C, [C])
+        
+        ordered = graph.toposort()
+        self.assertEqual(ordered[0], C)
+        self.assertEqual(set(ordered[1:]), set([A, B]))
+
+
+class ExportTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        class D(object):
+            a = inject.attr(A)
+        
+        self.D = D
+        self.injector = Injector(stats=True)
+        self.injector.bind_factory('d', D)
+        self.injector.get('d')
+        self.injector.get('d')
+    
+    def testExport(self):
+        '''export should return annotated nodes and edges.'''
+        graph = export(self.injector)
+        nodes = dict((node['id'], node) for node in graph['nodes'])
+        
+        d = nodes["'d'"]
+        self.assertEqual(d['scope'], 'ApplicationScope')
+        self.assertEqual(d['resolutions'], 2)
+        self.assertEqual(d['constructions'], 1)
+        
+        a = nodes[get_type_name(A)]
+        self.assertEqual(a['scope'], None)
+        self.assertEqual(a['resolutions'], 0)
+        
+        self.assertTrue({'from': "'d'", 'to': get_type_name(A)}
+                        in graph['edges'])
+    
+    def testToJson(self):
+        graph = json.loads(to_json(self.injector))
+        self.assertEqual(len(graph['nodes']), len(export(self.injector)['nodes']))
+    
+    def testToDot(self):
+        dot = to_dot(self.injector)
+        self.assertTrue(dot.startswith('digraph inject {'))
+        self.assertTrue('"\'d\'" -> "%s";' % get_type_name(A) in dot)
+    
+    def testSameNames(self):
+        '''export should make node ids of types with the same names unique.'''
+        class A(object): pass
+        injector = Injector()
+        injector.bind_factory(A, A)
+        injector.bind_factory(globals()['A'], A)
+        
+        ids = [node['id'] for node in export(injector)['nodes']]
+        self.assertEqual(len(ids), len(set(ids)))
@@ -1,8 +1,12 @@
+import gc
 import unittest
 
+import inject
 from inject.injections import InjectionPoint, AttributeInjection, \
     ParamInjection, NoParamError, NamedAttributeInjection, \
-    ClassAttributeInjection
+    ClassAttributeInjection, get_injection_points, enable_call_counters, \
+    disable_call_counters, reset_call_counters, get_call_sites, \
+    format_call_sites
 from inject.injectors import Injector
 
 
@@ -26,6 +30,18 @@ class InjectionTestCase(unittest.TestCase):
         a2 = injection_point.get_instance()
         
         self.assertTrue(a2 is a)
+    
+    def testRegistry(self):
+        '''InjectionPoint should be weakly registered.'''
+        class A(object): pass
+        
+        point = InjectionPoint(A)
+        self.assertTrue(point in get_injection_points())
+        
+        del point
+        gc.collect()
+        types = [p.type for p in get_injection_points()]
+        self.assertFalse(A in types)
 
 
 class AttributeInjectionTestCase(unittest.TestCase):
@@ -274,3 +290,54 @@ class ParamTestCase(unittest.TestCase):
         wrapper = ParamInjection.create_wrapper(func3)
         ParamInjection.add_injection(wrapper, 'kwarg', 'inj')
         self.assertEqual(wrapper.injections['kwarg'], 'inj')
+
+
+class CallCountersTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = Injector()
+        self.injector.register()
+        reset_call_counters()
+        enable_call_counters()
+    
+    def tearDown(self):
+        disable_call_counters()
+        self.injector.unregister()
+    
+    def testCounters(self):
+        '''Injection points should count calls and record their call sites.'''
+        class A(object): pass
+        class B(object):
+            a = inject.attr(A)
+            a2 = inject.class_attr(A)
+        
+        @inject.param('a', A)
+        def func(a):
+            pass
+        
+        b = B()
+        b.a
+        b.a2
+        b.a2
+        func()
+        
+        sites = dict(((site['owner'], site['name']), site)
+                     for site in get_call_sites())
+        self.assertEqual(sites[(B, 'a')]['calls'], 1)
+        self.assertEqual(sites[(B, 'a2')]['calls'], 2)
+        self.assertEqual(sites[(func.func, 'a')]['calls'], 1)
+        self.assertEqual(sites[(B, 'a2')]['type'], A)
+        
+        report = format_call_sites()
+        self.assertTrue('B.a2 ->' in report)
+        
+        reset_call_counters()
+        self.assertEqual(get_call_sites(), [])
+    
+    def testDisabled(self):
+        class A(object): pass
+        point = InjectionPoint(A)
+        
+        disable_call_counters()
+        point.get_instance()
+        self.assertEqual(point.calls, 0)
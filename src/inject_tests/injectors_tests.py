@@ -1,10 +1,14 @@
+import gc
+import logging
+import threading
 import unittest
 
 import inject
 from inject.exc import NotBoundError, InjectorAlreadyRegistered, \
-    NoInjectorRegistered
-from inject.injectors import Injector
-from inject.scopes import ThreadScope
+    NoInjectorRegistered, AutobindingFailed, VerificationFailed
+from inject.injectors import Injector, PREFORK_GC_THRESHOLD
+from inject.scopes import AbstractScope, ApplicationScope, NoScope, \
+    ThreadScope, RequestScope, ThreadLocalBindings, scoped
 
 
 class InjectorTestCase(unittest.TestCase):
@@ -117,6 +121,485 @@ class InjectorTestCase(unittest.TestCase):
         class A(object): pass
         self.assertTrue(injector2.get(A, none=True) is None)
 
+    
+    def testGetRoutes(self):
+        '''Injector.get should drop a route when a type is bound
+        in an earlier scope.
+        '''
+        class A(object): pass
+        
+        injector = Injector()
+        scope = injector.get(RequestScope)
+        scope.bind_factory(A, A)
+        
+        with scope:
+            a = injector.get(A)
+            self.assertTrue(injector.get(A) is a)
+            
+            a2 = A()
+            injector.get(ThreadScope).bind(A, a2)
+            self.assertTrue(injector.get(A) is a2)
+            
+            a3 = A()
+            injector.bind(A, a3)
+            self.assertTrue(injector.get(A) is a3)
+    
+    def testGetRoutesUnbind(self):
+        class A(object): pass
+        a = A()
+        a2 = A()
+        
+        injector = Injector()
+        injector.bind(A, a)
+        injector.get(ThreadScope).bind(A, a2)
+        self.assertTrue(injector.get(A) is a)
+        
+        injector.unbind(A)
+        self.assertTrue(injector.get(A) is a2)
+    
+    def testGetRoutesThreadLocal(self):
+        '''Injector.get should not route a type to a request-local factory
+        in one thread, when another thread has a thread-local binding.
+        '''
+        class A(object): pass
+        a = A()
+        
+        injector = Injector()
+        reqscope = injector.get(RequestScope)
+        reqscope.bind_factory(A, A)
+        injector.get(ThreadScope).bind(A, a)
+        
+        def get():
+            with reqscope:
+                self.assertTrue(injector.get(A) is not a)
+        
+        thread = threading.Thread(target=get)
+        thread.start()
+        thread.join()
+        
+        with reqscope:
+            self.assertTrue(injector.get(A) is a)
+    
+    def testGetMisses(self):
+        '''Injector.get should cache misses, and drop them on binds.'''
+        injector = Injector()
+        self.assertTrue(injector.get('key', none=True) is None)
+        self.assertTrue('key' in injector._misses)
+        self.assertRaises(NotBoundError, injector.get, 'key')
+        
+        injector.bind_factory('key', lambda: 'factory')
+        self.assertTrue('key' not in injector._misses)
+        self.assertEqual(injector.get('key'), 'factory')
+        
+        self.assertTrue(injector.get('key2', none=True) is None)
+        injector.bind('key2', 'value')
+        self.assertEqual(injector.get('key2'), 'value')
+    
+    def testGetMissesThreadLocal(self):
+        '''Injector.get should check thread-local bindings of known misses.'''
+        injector = Injector()
+        thread_scope = injector.get(ThreadScope)
+        self.assertTrue(injector.get('key', none=True) is None)
+        
+        def bind():
+            self.assertTrue(injector.get('key', none=True) is None)
+            thread_scope.bind('key', 'value')
+            self.assertEqual(injector.get('key'), 'value')
+        
+        thread = threading.Thread(target=bind)
+        thread.start()
+        thread.join()
+        
+        self.assertTrue(injector.get('key', none=True) is None)
+        
+        reqscope = injector.get(RequestScope)
+        with reqscope:
+            reqscope.bind('key', 'request')
+            self.assertEqual(injector.get('key'), 'request')
+        self.assertTrue(injector.get('key', none=True) is None)
+    
+    def testGetMissesCustomThreadLocal(self):
+        '''Injector.get should check thread-local bindings of known misses
+        in custom scopes which do not declare the local attribute.
+        '''
+        class Scope(AbstractScope):
+            logger = logging.getLogger('inject_tests.Scope')
+            def __init__(self):
+                super(Scope, self).__init__(ThreadLocalBindings())
+        
+        injector = Injector()
+        scope = Scope()
+        injector.bind_scope(Scope, scope)
+        scope.bind('key', 'value')
+        
+        thread = threading.Thread(
+            target=lambda: injector.get('key', none=True))
+        thread.start()
+        thread.join()
+        
+        self.assertTrue('key' in injector._misses)
+        self.assertEqual(injector.get('key', none=True), 'value')
+    
+    def testGetMissesAutobind(self):
+        class A(object): pass
+        
+        injector = Injector(autobind=False)
+        self.assertTrue(injector.get(A, none=True) is None)
+        
+        injector.autobind = True
+        self.assertTrue(isinstance(injector.get(A), A))
+
+
+class InjectorVerifyTestCase(unittest.TestCase):
+    
+    def testVerify(self):
+        class A(object): pass
+        class B(object):
+            a = inject.attr(A)
+            c = inject.attr('c', none=True)
+        
+        injector = Injector(autobind=False)
+        injector.bind_factory(A, A)
+        injector.verify([B.a.injection, B.c.injection])
+        
+        self.assertTrue(injector._routes[A] is injector.get(ApplicationScope))
+        self.assertFalse(injector.is_bound(A))
+    
+    def testVerifyResolve(self):
+        class A(object): pass
+        class B(object):
+            a = inject.attr(A)
+        
+        injector = Injector()
+        injector.verify([B.a.injection], resolve=True)
+        self.assertTrue(injector.is_bound(A))
+    
+    def testVerifyFailed(self):
+        class B(object):
+            a = inject.attr('missing')
+        
+        injector = Injector(autobind=False)
+        try:
+            injector.verify([B.a.injection])
+        except VerificationFailed, e:
+            errors = [point.type for point, error in e.errors]
+            self.assertTrue('missing' in errors)
+        else:
+            self.fail('VerificationFailed is not raised.')
+    
+    def testVerifyResolveFailed(self):
+        class A(object):
+            def __init__(self):
+                raise ValueError()
+        class B(object):
+            a = inject.attr(A)
+        
+        injector = Injector()
+        self.assertRaises(VerificationFailed, injector.verify,
+                          [B.a.injection], resolve=True)
+
+
+class InjectorTransactionTestCase(unittest.TestCase):
+    
+    def testTransaction(self):
+        class A(object): pass
+        
+        injector = Injector()
+        injector.bind('a', 'old')
+        injector.bind('b', 'old')
+        old = injector.get(ApplicationScope)
+        
+        with injector.transaction() as scope:
+            scope.bind('a', 'new')
+            scope.unbind('b')
+            scope.bind_factory(A, A)
+            self.assertEqual(injector.get('a'), 'old')
+            self.assertEqual(injector.get('b'), 'old')
+        
+        self.assertEqual(injector.get('a'), 'new')
+        self.assertTrue(injector.get('b', none=True) is None)
+        self.assertTrue(isinstance(injector.get(A), A))
+        self.assertTrue(injector.get(ApplicationScope) is scope)
+        self.assertTrue(injector.get(Injector) is injector)
+        self.assertEqual(injector.get_scopes()[0], scope)
+        self.assertEqual(old.get('a'), 'old')
+    
+    def testTransactionRoutes(self):
+        '''Injector.transaction should clear the routes.'''
+        injector = Injector()
+        injector.get(ThreadScope).bind('a', 'thread')
+        self.assertEqual(injector.get('a'), 'thread')
+        
+        injector.bind_many({'a': 'app', 'b': 'app'})
+        self.assertEqual(injector.get('a'), 'app')
+        self.assertEqual(injector.get('b'), 'app')
+        
+        injector.bind('c', 'value')
+        self.assertEqual(injector.get('c'), 'value')
+    
+    def testTransactionCreated(self):
+        '''Injector.transaction should publish instances which are created
+        concurrently during the transaction.
+        '''
+        class A(object): pass
+        class B(object): pass
+        class C(object):
+            closed = False
+            def close(self):
+                self.closed = True
+        
+        injector = Injector()
+        injector.bind_factory(A, A)
+        injector.bind_factory(C, C)
+        created = []
+        
+        def get():
+            created.extend([injector.get(A), injector.get(B),
+                            injector.get(C)])
+        
+        with injector.transaction() as scope:
+            scope.bind_factory(C, lambda: C())
+            thread = threading.Thread(target=get)
+            thread.start()
+            thread.join()
+        
+        a, b, c = created
+        self.assertTrue(injector.get(A) is a)
+        self.assertTrue(injector.get(B) is b)
+        self.assertTrue(scope.is_bound(A))
+        self.assertTrue(c.closed)
+        self.assertTrue(injector.get(C) is not c)
+    
+    def testTransactionBound(self):
+        '''Injector.transaction should not move or dispose objects which
+        are bound explicitly during the transaction.
+        '''
+        class Conn(object):
+            closed = False
+            def close(self):
+                self.closed = True
+        conn = Conn()
+        
+        injector = Injector()
+        old = injector.get(ApplicationScope)
+        with injector.transaction() as scope:
+            scope.bind(Conn, Conn())
+            injector.bind(Conn, conn)
+            injector.bind('a', 'value')
+        
+        self.assertFalse(conn.closed)
+        self.assertTrue(injector.get(Conn) is not conn)
+        self.assertFalse(scope.is_bound('a'))
+        
+        old.bind('b', 'value')
+        self.assertFalse(scope.is_bound('b'))
+    
+    def testTransactionAfterFork(self):
+        '''Injector.after_fork should reset the transaction lock.'''
+        injector = Injector(backoff=inject.Backoff())
+        injector._transaction_lock.acquire()
+        injector.failures._lock.acquire()
+        
+        injector.after_fork()
+        with injector.transaction():
+            pass
+        injector.failures.clear()
+    
+    def testTransactionCreatedLate(self):
+        '''Injector.transaction should publish instances which are created
+        in the old scope after the new one has been published.
+        '''
+        class A(object): pass
+        
+        injector = Injector()
+        injector.bind_factory(A, A)
+        old = injector.get(ApplicationScope)
+        
+        with injector.transaction() as scope:
+            pass
+        
+        a = old.get(A)
+        self.assertTrue(scope.get(A) is a)
+        self.assertTrue(injector.get(A) is a)
+    
+    def testTransactionError(self):
+        injector = Injector()
+        injector.bind('a', 'old')
+        scope = injector.get(ApplicationScope)
+        
+        try:
+            with injector.transaction() as new:
+                new.bind('a', 'new')
+                raise ValueError()
+        except ValueError:
+            pass
+        
+        self.assertEqual(injector.get('a'), 'old')
+        self.assertTrue(injector.get(ApplicationScope) is scope)
+
+
+class InjectorOverrideTestCase(unittest.TestCase):
+    
+    def testOverride(self):
+        class A(object): pass
+        class B(object): pass
+        a = A()
+        
+        injector = Injector()
+        injector.bind(A, a)
+        injector.bind_factory(B, B, per_process=True, timeout=5)
+        b = injector.get(B)
+        
+        with injector.override({A: 'fake_a', B: 'fake_b', 'c': 'fake_c'}):
+            self.assertEqual(injector.get(A), 'fake_a')
+            self.assertEqual(injector.get(B), 'fake_b')
+            self.assertEqual(injector.get('c'), 'fake_c')
+        
+        self.assertTrue(injector.get(A) is a)
+        self.assertTrue(injector.get(B) is b)
+        self.assertFalse(injector.is_bound('c'))
+        self.assertTrue(injector.get('c', none=True) is None)
+        
+        scope = injector.get(ApplicationScope)
+        self.assertTrue(scope.is_per_process(B))
+        self.assertEqual(scope.get_timeout(B), 5)
+    
+    def testOverrideScopes(self):
+        '''Injector.override should restore bindings in their scopes.'''
+        class A(object): pass
+        
+        injector = Injector()
+        injector.get(ThreadScope).bind_factory(A, A)
+        a = injector.get(A)
+        injector.get('c', none=True)
+        
+        with injector.override({A: 'fake', 'c': 'fake_c'}):
+            self.assertEqual(injector.get(A), 'fake')
+            self.assertEqual(injector.get('c'), 'fake_c')
+            
+            with injector.override({A: 'fake2'}):
+                self.assertEqual(injector.get(A), 'fake2')
+            self.assertEqual(injector.get(A), 'fake')
+        
+        self.assertTrue(injector.get(A) is a)
+        self.assertFalse(injector.get(ApplicationScope).is_bound(A))
+        self.assertTrue(injector.get(ThreadScope).is_bound(A))
+        self.assertTrue(injector.get('c', none=True) is None)
+    
+    def testOverrideError(self):
+        injector = Injector()
+        injector.bind('a', 'value')
+        
+        try:
+            with injector.override({'a': 'fake'}):
+                raise ValueError()
+        except ValueError:
+            pass
+        
+        self.assertEqual(injector.get('a'), 'value')
+    
+    def testOverridePins(self):
+        '''Injector.override should restore the pins.'''
+        class A(object): pass
+        class B(object): pass
+        
+        injector = Injector()
+        injector.bind_factory(A, A, scope=ThreadScope)
+        
+        with injector.override({A: 'fake'}):
+            self.assertEqual(injector.get(A), 'fake')
+            self.assertTrue(injector.get_pin(A) is None)
+            injector.pin(B, ThreadScope)
+        
+        self.assertTrue(injector.get_pin(A) is ThreadScope)
+        self.assertTrue(injector.get_pin(B) is None)
+        self.assertTrue(isinstance(injector.get(A), A))
+
+
+class ChildInjectorTestCase(unittest.TestCase):
+    
+    def testGet(self):
+        '''ChildInjector should fall back to its parent.'''
+        class A(object): pass
+        class B(object): pass
+        
+        injector = Injector()
+        injector.bind('key', 'parent')
+        injector.bind_factory(A, A)
+        
+        child = injector.child()
+        child.bind('key', 'child')
+        
+        self.assertEqual(child.get('key'), 'child')
+        self.assertEqual(injector.get('key'), 'parent')
+        self.assertTrue(child.get(A) is injector.get(A))
+        self.assertTrue(child.get(Injector) is child)
+        self.assertTrue(child.get(RequestScope) is injector.get(RequestScope))
+        
+        b = child.get(B)
+        self.assertTrue(injector.get(B) is b)
+        self.assertTrue(child.get('missing', none=True) is None)
+        self.assertRaises(NotBoundError, child.get, 'missing2')
+    
+    def testNoCopy(self):
+        '''ChildInjector should not copy its parent bindings.'''
+        injector = Injector()
+        for i in range(100):
+            injector.bind(i, i)
+        
+        child = injector.child()
+        self.assertEqual(child.get_scopes(), [child._app_scope])
+        self.assertEqual(set(child._app_scope.bound_types()),
+                         set([Injector, ApplicationScope]))
+        
+        injector.bind(100, 'parent')
+        self.assertEqual(child.get(100), 'parent')
+        child.bind(100, 'child')
+        self.assertEqual(child.get(100), 'child')
+    
+    def testBindFactory(self):
+        class A(object): pass
+        
+        injector = Injector()
+        child = injector.child()
+        child.bind_factory(A, A)
+        
+        a = child.get(A)
+        self.assertTrue(child.get(A) is a)
+        self.assertFalse(injector.is_bound(A))
+        self.assertEqual(child.get_resolution(A), (child._app_scope, None))
+        self.assertEqual(child.get_resolution(Injector)[0], child._app_scope)
+        self.assertEqual(child.get_resolution('key'), (None, None))
+    
+    def testDispose(self):
+        '''Injector.dispose should dispose only the factory instances.'''
+        class A(object):
+            closed = False
+            def close(self):
+                self.closed = True
+        
+        injector = Injector()
+        child = injector.child()
+        child.bind_factory(A, A)
+        bound = A()
+        child.bind('bound', bound)
+        
+        a = child.get(A)
+        child.dispose()
+        self.assertTrue(a.closed)
+        self.assertFalse(bound.closed)
+        self.assertFalse(child.get(A) is a)
+    
+    def testChain(self):
+        injector = Injector()
+        injector.bind('a', 'parent')
+        child = injector.child()
+        child.bind('b', 'child')
+        
+        grandchild = child.child()
+        self.assertEqual(grandchild.get('a'), 'parent')
+        self.assertEqual(grandchild.get('b'), 'child')
+
 
 class InjectorFactoriesTestCase(unittest.TestCase):
     
@@ -161,6 +644,126 @@ class InjectorFactoriesTestCase(unittest.TestCase):
         injector.unbind_factory(A) # Nothing happens.
 
 
+class InjectorWarmupTestCase(unittest.TestCase):
+    
+    def testWarmup(self):
+        '''Injector.warmup should instantiate factories and given types.'''
+        class A(object): pass
+        class B(object): pass
+        class C(object): pass
+        
+        injector = Injector()
+        injector.bind_factory(A, A)
+        
+        warmed = injector.warmup([B])
+        self.assertTrue(A in warmed)
+        self.assertTrue(B in warmed)
+        self.assertTrue(injector.is_bound(A))
+        self.assertTrue(injector.is_bound(B))
+        self.assertFalse(injector.is_bound(C))
+    
+    def testWarmupPrefork(self):
+        '''Injector.warmup should skip per-process factories for prefork.'''
+        class A(object): pass
+        class B(object): pass
+        
+        injector = Injector()
+        injector.bind_factory(A, A, per_process=True)
+        injector.bind_factory(B, B)
+        
+        warmed = injector.warmup(prefork=True)
+        self.assertFalse(A in warmed)
+        self.assertFalse(injector.is_bound(A))
+        self.assertTrue(injector.is_bound(B))
+
+    
+    def testWarmupPreforkGC(self):
+        '''Injector.after_fork should raise the GC threshold in children
+        after a prefork warmup, when gc.freeze is not available.
+        '''
+        threshold = gc.get_threshold()
+        injector = Injector()
+        try:
+            injector.warmup(prefork=True)
+            injector.after_fork()
+            
+            if hasattr(gc, 'freeze'):
+                self.assertEqual(gc.get_threshold(), threshold)
+            else:
+                self.assertEqual(gc.get_threshold()[2],
+                                 max(threshold[2], PREFORK_GC_THRESHOLD))
+        finally:
+            gc.set_threshold(*threshold)
+    
+    def testWarmupDependencies(self):
+        '''Injector.warmup should create dependencies first.'''
+        created = []
+        class A(object):
+            def __init__(self):
+                created.append(A)
+        class B(object):
+            a = inject.attr(A)
+            def __init__(self):
+                created.append(B)
+        
+        injector = Injector()
+        injector.bind_factory('b', B)
+        
+        self.assertEqual(injector.warmup(), [A, 'b'])
+        self.assertEqual(created, [A, B])
+    
+    def testWarmupConcurrently(self):
+        '''Injector.warmup should create independent types concurrently.'''
+        event = threading.Event()
+        class A(object):
+            def __init__(self):
+                event.wait(5)
+                self.ok = event.isSet()
+        class B(object):
+            def __init__(self):
+                event.set()
+        class C(object):
+            a = inject.attr(A)
+            b = inject.attr(B)
+        
+        injector = Injector()
+        warmed = injector.warmup([C], workers=2)
+        
+        self.assertEqual(set(warmed[:2]), set([A, B]))
+        self.assertEqual(warmed[2], C)
+        self.assertTrue(injector.get(A).ok)
+    
+    def testWarmupConcurrentlyUseInjector(self):
+        '''Injector.warmup should create types with the current injector.'''
+        class A(object):
+            @inject.param('value', 'key')
+            def __init__(self, value):
+                self.value = value
+        
+        injector = Injector()
+        injector.bind('key', 'registered')
+        child = injector.child()
+        child.bind('key', 'child')
+        child.bind_factory(A, A)
+        
+        injector.register()
+        try:
+            with inject.use_injector(child):
+                child.warmup([A], workers=2)
+        finally:
+            injector.unregister()
+        
+        self.assertEqual(child.get(A).value, 'child')
+    
+    def testWarmupConcurrentlyError(self):
+        class A(object):
+            def __init__(self):
+                raise ValueError()
+        
+        injector = Injector()
+        self.assertRaises(AutobindingFailed, injector.warmup, [A], workers=2)
+
+
 class InjectorScopesTestCase(unittest.TestCase):
 
     def testBindScope(self):
@@ -185,6 +788,99 @@ class InjectorScopesTestCase(unittest.TestCase):
         self.assertFalse(injector.is_scope_bound(Scope))
 
 
+class InjectorPinsTestCase(unittest.TestCase):
+    
+    def testBindFactoryScope(self):
+        class A(object): pass
+        
+        injector = Injector()
+        injector.bind_factory(A, A, scope=RequestScope)
+        reqscope = injector.get(RequestScope)
+        
+        self.assertTrue(reqscope.is_factory_bound(A))
+        self.assertTrue(injector.get_pin(A) is RequestScope)
+        
+        with reqscope:
+            a = injector.get(A)
+            self.assertTrue(isinstance(a, A))
+            self.assertTrue(injector.get(A) is a)
+        
+        with reqscope:
+            self.assertTrue(injector.get(A) is not a)
+    
+    def testBindFactoryUnboundScope(self):
+        class A(object): pass
+        
+        injector = Injector()
+        self.assertRaises(ValueError, injector.bind_factory, A, A,
+                          scope=NoScope)
+    
+    def testPinnedGetSkipsStack(self):
+        '''Injector should go straight to the pinned scope.'''
+        class A(object): pass
+        
+        injector = Injector()
+        injector.bind_factory(A, A, scope=ThreadScope)
+        injector.get(A)
+        
+        injector._scopes_stack = []
+        injector._routes.clear()
+        self.assertTrue(isinstance(injector.get(A), A))
+    
+    def testPinFallback(self):
+        '''Injector should search the stack when the pinned scope does not
+        have a type.
+        '''
+        class A(object): pass
+        a = A()
+        
+        injector = Injector()
+        injector.pin(A, ThreadScope)
+        injector.bind(A, a)
+        
+        self.assertTrue(injector.get(A) is a)
+    
+    def testUnpinOnBindInAnotherScope(self):
+        class A(object): pass
+        a = A()
+        
+        injector = Injector()
+        injector.bind_factory(A, A, scope=ThreadScope)
+        injector.get(A)
+        
+        injector.bind(A, a)
+        self.assertTrue(injector.get_pin(A) is None)
+        self.assertTrue(injector.get(A) is a)
+        
+        injector.pin(A, ThreadScope)
+        injector.unpin(A)
+        self.assertTrue(injector.get_pin(A) is None)
+    
+    def testScopedClass(self):
+        @scoped(RequestScope)
+        class A(object): pass
+        
+        injector = Injector()
+        reqscope = injector.get(RequestScope)
+        with reqscope:
+            a = injector.get(A)
+            self.assertTrue(injector.get(A) is a)
+            self.assertTrue(reqscope.is_bound(A))
+        
+        self.assertFalse(injector.get(ApplicationScope).is_bound(A))
+        self.assertTrue(injector.get_pin(A) is RequestScope)
+        
+        with reqscope:
+            self.assertTrue(injector.get(A) is not a)
+    
+    def testScopedClassWithoutAutobind(self):
+        @scoped(ThreadScope)
+        class A(object): pass
+        
+        injector = Injector(autobind=False)
+        self.assertRaises(NotBoundError, injector.get, A)
+
+
 class InjectorRegisterationTestCase(unittest.TestCase):
     
     def tearDown(self):
@@ -195,6 +891,19 @@ class InjectorRegisterationTestCase(unittest.TestCase):
         injector = inject.create()
         self.assertTrue(injector.is_registered())
     
+    def testCreateLazyLegacyFactory(self):
+        '''create_lazy should support factories without the new arguments.'''
+        def factory(autobind=True, echo=False):
+            return Injector(autobind=autobind, echo=echo)
+        
+        inject.create_lazy(lambda injector: injector.bind('key', 'value'),
+                           factory=factory)
+        self.assertEqual(inject.get_instance('key'), 'value')
+        
+        inject.unregister()
+        inject.create_lazy(lambda injector: None, stats=True)
+        self.assertTrue(inject.get_injector().collect_stats)
+    
     def testRegisterUnregister(self):
         injector = Injector()
         injector2 = Injector()
@@ -229,3 +938,35 @@ class InjectorRegisterationTestCase(unittest.TestCase):
         injector.register()
         self.assertTrue(injector.is_registered())
         self.assertFalse(injector2.is_registered())
+    
+    def testUseInjector(self):
+        '''use_injector should override the registered injector
+        in the current thread.
+        '''
+        injector = inject.create()
+        injector.bind('key', 'registered')
+        child = injector.child()
+        child.bind('key', 'child')
+        
+        with inject.use_injector(child):
+            self.assertTrue(inject.get_injector() is child)
+            self.assertEqual(inject.get_instance('key'), 'child')
+            self.assertTrue(inject.is_registered(injector))
+            
+            values = []
+            thread = threading.Thread(
+                target=lambda: values.append(inject.get_instance('key')))
+            thread.start()
+            thread.join()
+            self.assertEqual(values, ['registered'])
+        
+        self.assertTrue(inject.get_injector() is injector)
+        self.assertEqual(inject.get_instance('key'), 'registered')
+    
+    def testUseInjectorNotRegistered(self):
+        injector = Injector()
+        injector.bind('key', 'value')
+        
+        with inject.use_injector(injector):
+            self.assertEqual(inject.get_instance('key'), 'value')
+        self.assertRaises(NoInjectorRegistered, inject.get_instance, 'key')
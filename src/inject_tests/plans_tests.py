@@ -0,0 +1,83 @@
+import marshal
+import os
+import shutil
+import tempfile
+import unittest
+
+from inject import injections
+from inject.injections import AttributeInjection
+from inject.injectors import Injector
+from inject.plans import create_plan, save_plan, load_plan, clear_plan
+
+
+class A(object):
+    
+    pass
+
+
+class Base(object):
+    
+    a = AttributeInjection(A)
+
+
+class Derived(Base):
+    
+    pass
+
+
+class PlansTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = Injector()
+        self.injector.register()
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'inject.plan')
+        Derived().a
+    
+    def tearDown(self):
+        clear_plan()
+        self.injector.unregister()
+        shutil.rmtree(self.dir)
+    
+    def testCreatePlan(self):
+        plan = create_plan()
+        self.assertEqual(plan['attrs'][__name__ + '.Derived'], ['a'])
+        self.assertTrue(os.path.abspath(__file__) in plan['files'] or
+                        os.path.abspath(__file__ + 'c') in plan['files'] or
+                        os.path.abspath(__file__[:-1]) in plan['files'])
+    
+    def testSaveLoad(self):
+        save_plan(self.path)
+        self.assertTrue(load_plan(self.path))
+        
+        descriptor = Base.__dict__['a']
+        self.assertEqual(
+            injections._get_planned_attrname(Derived, descriptor), 'a')
+        self.assertEqual(
+            injections._get_planned_attrname(Base, descriptor), None)
+    
+    def testPlannedAttr(self):
+        '''AttributeInjection should use a planned attribute name.'''
+        class C(object):
+            b = AttributeInjection(A)
+        
+        injections._planned_attrs = {__name__ + '.C': ['b']}
+        
+        descriptor = C.__dict__['b']
+        self.assertEqual(descriptor._get_set_attr(C), 'b')
+        self.assertTrue(isinstance(C().b, A))
+    
+    def testStalePlan(self):
+        save_plan(self.path)
+        plan = marshal.load(open(self.path, 'rb'))
+        plan['hash'] = 'stale'
+        marshal.dump(plan, open(self.path, 'wb'))
+        
+        self.assertFalse(load_plan(self.path))
+        self.assertEqual(injections._planned_attrs, {})
+    
+    def testInvalidPlan(self):
+        self.assertFalse(load_plan(self.path))
+        
+        open(self.path, 'wb').write('invalid')
+        self.assertFalse(load_plan(self.path))
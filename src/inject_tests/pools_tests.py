@@ -0,0 +1,52 @@
+import threading
+import unittest
+
+from inject.pools import ThreadPool, get_shared_pool, spawn
+
+
+class ThreadPoolTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.pool = ThreadPool(2)
+    
+    def tearDown(self):
+        self.pool.shutdown()
+    
+    def testSubmit(self):
+        def func(a, b):
+            return a, b, threading.currentThread()
+        
+        future = self.pool.submit(func, 1, b=2)
+        a, b, thread = future.result()
+        
+        self.assertTrue(future.done())
+        self.assertEqual((a, b), (1, 2))
+        self.assertFalse(thread is threading.currentThread())
+    
+    def testException(self):
+        def func():
+            raise ValueError()
+        
+        future = self.pool.submit(func)
+        self.assertRaises(ValueError, future.result)
+    
+    def testConcurrent(self):
+        '''ThreadPool should run callables concurrently.'''
+        event = threading.Event()
+        
+        waiter = self.pool.submit(event.wait)
+        self.pool.submit(event.set).result()
+        waiter.result()
+    
+    def testSharedPool(self):
+        self.assertTrue(get_shared_pool() is get_shared_pool())
+    
+    def testSpawn(self):
+        event = threading.Event()
+        
+        future = spawn(event.wait)
+        self.assertFalse(future.wait(0.01))
+        
+        event.set()
+        self.assertTrue(future.wait(1))
+        self.assertTrue(future.result())
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+import inject
+from inject.injectors import Injector, LazyInjector
+from inject.profiling import StartupProfiler
+
+
+class StartupProfilerTestCase(unittest.TestCase):
+    
+    def testRecord(self):
+        '''StartupProfiler should record nested operations.'''
+        profiler = StartupProfiler()
+        with profiler.record('factory', 'outer'):
+            with profiler.record('bind', 'inner'):
+                pass
+        
+        inner, outer = profiler.records
+        self.assertEqual((inner.kind, inner.key), ('bind', 'inner'))
+        self.assertEqual((outer.kind, outer.key), ('factory', 'outer'))
+        self.assertTrue(outer.time >= inner.time)
+        self.assertTrue(outer.self_time <= outer.time - inner.time + 1e-9)
+        self.assertTrue('testRecord' in outer.stack[-1])
+    
+    def testReport(self):
+        profiler = StartupProfiler()
+        with profiler.record('bind', 'key'):
+            pass
+        
+        lines = profiler.report().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue("bind 'key'" in lines[1])
+    
+    def testCollapsed(self):
+        profiler = StartupProfiler()
+        with profiler.record('bind', 'key'):
+            pass
+        
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            profiler.write_collapsed(path)
+            line = open(path).read().strip()
+        finally:
+            os.remove(path)
+        
+        stack, count = line.rsplit(' ', 1)
+        self.assertTrue(stack.endswith(";bind 'key'"))
+        self.assertTrue(int(count) >= 0)
+
+
+class InjectorProfilingTestCase(unittest.TestCase):
+    
+    def tearDown(self):
+        inject.unregister()
+    
+    def testProfile(self):
+        '''Injector with profile=True should profile binds and creation.'''
+        class A(object): pass
+        class B(object): pass
+        
+        injector = Injector(profile=True)
+        injector.profiler.clear()
+        injector.bind_factory(A, A)
+        injector.get(A)
+        injector.get(B)
+        
+        records = [(r.kind, r.key) for r in injector.profiler.records]
+        self.assertTrue(('bind_factory', A) in records)
+        self.assertTrue(('factory', A) in records)
+        self.assertTrue(('autobind', B) in records)
+        self.assertTrue(('bind', B) in records)
+    
+    def testNoProfile(self):
+        injector = Injector()
+        self.assertTrue(injector.profiler is None)
+    
+    def testLazyInjector(self):
+        '''LazyInjector should profile its configuration.'''
+        def config(injector):
+            injector.bind('key', 'value')
+        
+        injector = LazyInjector(config, profile=True)
+        inject.register(injector)
+        real = injector._init_real_injector()
+        
+        records = [(r.kind, r.key) for r in real.profiler.records]
+        self.assertTrue(('config', config) in records)
@@ -0,0 +1,90 @@
+import unittest
+
+import inject
+try:
+    from inject import pytest_plugin
+except ImportError:
+    pytest_plugin = None
+
+
+class Item(object):
+    
+    def __init__(self):
+        self.user_properties = []
+
+
+class Report(object):
+    
+    def __init__(self, nodeid, when, user_properties):
+        self.nodeid = nodeid
+        self.when = when
+        self.user_properties = user_properties
+
+
+class TerminalReporter(object):
+    
+    def __init__(self):
+        self.sections = []
+        self.lines = []
+    
+    def section(self, title):
+        self.sections.append(title)
+    
+    def write_line(self, line):
+        self.lines.append(line)
+
+
+@unittest.skipIf(pytest_plugin is None, 'pytest is not installed')
+class PytestPluginTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = inject.create()
+        self.injector.bind('a', 'value')
+        del pytest_plugin._changed_tests[:]
+    
+    def tearDown(self):
+        inject.unregister()
+        del pytest_plugin._changed_tests[:]
+    
+    def run_test(self, item, test):
+        setup = pytest_plugin.pytest_runtest_setup(item)
+        next(setup)
+        self.assertRaises(StopIteration, next, setup)
+        
+        test()
+        
+        teardown = pytest_plugin.pytest_runtest_teardown(item, None)
+        next(teardown)
+        self.assertRaises(StopIteration, next, teardown)
+    
+    def testRestore(self):
+        item = Item()
+        self.run_test(item, lambda: self.injector.bind('a', 'changed'))
+        
+        self.assertEqual(self.injector.get('a'), 'value')
+        self.assertEqual(item.user_properties,
+                         [('inject_changes', ["'a'"])])
+    
+    def testNoChanges(self):
+        item = Item()
+        self.run_test(item, lambda: self.injector.get('a'))
+        self.assertEqual(item.user_properties, [])
+    
+    def testTerminalSummary(self):
+        item = Item()
+        self.run_test(item, lambda: self.injector.bind('b', 'value'))
+        
+        pytest_plugin.pytest_runtest_logreport(
+            Report('test_a', 'call', item.user_properties))
+        pytest_plugin.pytest_runtest_logreport(
+            Report('test_b', 'teardown', item.user_properties))
+        
+        reporter = TerminalReporter()
+        pytest_plugin.pytest_terminal_summary(reporter)
+        self.assertEqual(len(reporter.sections), 1)
+        self.assertEqual(reporter.lines, ["test_b: 'b'"])
+    
+    def testNoTerminalSummary(self):
+        reporter = TerminalReporter()
+        pytest_plugin.pytest_terminal_summary(reporter)
+        self.assertEqual(reporter.sections, [])
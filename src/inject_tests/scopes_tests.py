@@ -3,7 +3,9 @@ import unittest
 
 from inject.scopes import NoRequestError, ApplicationScope, \
     NoScope, RequestScope, ThreadScope
-from inject.exc import FactoryNotCallable
+from inject.exc import FactoryNotCallable, FactoryTimeout
+from inject.injectors import Injector, get_injector, use_injector
+from inject.pools import ThreadPool
 
 
 class A(object):
@@ -81,6 +83,51 @@ class ApplicationScopeTestCase(unittest.TestCase):
         self.assertRaises(FactoryNotCallable, s.bind_factory, 'some_key',
                           'not_callable')
     
+    def testBindFactoryTimeout(self):
+        s = self.new_scope()
+        event = threading.Event()
+        
+        s.bind_factory(A, lambda: event.wait(1) and A(), timeout=0.01)
+        self.assertEqual(s.get_timeout(A), 0.01)
+        self.assertRaises(FactoryTimeout, s.get, A)
+        self.assertFalse(s.is_bound(A))
+        
+        event.set()
+        self.assertTrue(isinstance(s.get(A), A))
+    
+    def testBindFactoryTimeoutHung(self):
+        '''Scope should not start a new thread while a factory is hung.'''
+        s = self.new_scope()
+        event = threading.Event()
+        calls = []
+        def factory():
+            calls.append(True)
+            event.wait()
+            return A()
+        
+        s.bind_factory(A, factory, timeout=0.01)
+        threads = threading.activeCount()
+        for i in range(5):
+            self.assertRaises(FactoryTimeout, s.get, A)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(threading.activeCount() <= threads + 1)
+        
+        event.set()
+        self.assertTrue(isinstance(s.get(A), A))
+        self.assertEqual(len(calls), 2)
+    
+    def testBindFactoryTimeoutInjector(self):
+        '''Scope should run a factory with a timeout with the current
+        injector.
+        '''
+        s = self.new_scope()
+        injector = Injector()
+        
+        s.bind_factory('key', get_injector, timeout=1)
+        with use_injector(injector):
+            self.assertTrue(s.get('key') is injector)
+    
     def testUnbindFactory(self):
         s = self.new_scope()
         
@@ -228,3 +275,107 @@ class RequestScopeTestCase(ApplicationScopeTestCase):
         
         with s:
             self.assertTrue(s.get(A) is None)
+    
+    def testDisposeOnEnd(self):
+        '''RequestScope should close objects created by its factories.'''
+        class B(object):
+            closed = False
+            def close(self):
+                self.closed = True
+        
+        s = RequestScope(dispose=True)
+        s.bind_factory(B, B)
+        
+        s.start()
+        b = s.get(B)
+        bound = B()
+        s.bind('bound', bound)
+        s.end()
+        
+        self.assertTrue(b.closed)
+        self.assertFalse(bound.closed)
+    
+    def testNoDispose(self):
+        class B(object):
+            closed = False
+            def close(self):
+                self.closed = True
+        
+        s = RequestScope()
+        s.bind_factory(B, B)
+        
+        with s:
+            b = s.get(B)
+        self.assertFalse(b.closed)
+    
+    def testDisposeWithReaper(self):
+        '''RequestScope should pass owned objects to a reaper.'''
+        class Reaper(object):
+            def __init__(self):
+                self.objs = []
+            def put(self, objs):
+                self.objs.extend(objs)
+        
+        reaper = Reaper()
+        s = RequestScope(dispose=True, reaper=reaper)
+        s.bind_factory(A, A)
+        
+        with s:
+            a = s.get(A)
+            self.assertTrue(s.get(A) is a)
+            self.assertEqual(reaper.objs, [])
+        
+        self.assertEqual(reaper.objs, [a])
+    
+    def testPrefetch(self):
+        '''RequestScope should run prefetched factories in other threads.'''
+        class B(object):
+            def __init__(self):
+                self.thread = threading.currentThread()
+        
+        s = RequestScope()
+        s.bind_factory(A, A)
+        s.bind_factory(B, B)
+        
+        s.start(prefetch=[A, B, 'no_factory'])
+        self.assertTrue(s.is_bound(A))
+        self.assertTrue(s.is_bound(B))
+        self.assertFalse(s.is_bound('no_factory'))
+        self.assertFalse(s.get(B).thread is threading.currentThread())
+        s.end()
+    
+    def testPrefetchError(self):
+        '''RequestScope should end a request when a prefetch fails.'''
+        def factory():
+            raise ValueError()
+        
+        s = RequestScope()
+        s.bind_factory(A, A)
+        s.bind_factory('b', factory)
+        
+        self.assertRaises(ValueError, s.start, prefetch=[A, 'b'])
+        self.assertRaises(NoRequestError, s.get, A)
+    
+    def testPrefetchTimeout(self):
+        '''RequestScope should not occupy the pool with hung factories.'''
+        event = threading.Event()
+        pool = ThreadPool(2)
+        
+        s = RequestScope(pool=pool)
+        types = ['hung%s' % i for i in range(3)]
+        for type in types:
+            s.bind_factory(type, event.wait, timeout=0.01)
+        s.bind_factory(A, A)
+        
+        try:
+            self.assertRaises(FactoryTimeout, s.start, prefetch=types)
+            self.assertRaises(FactoryTimeout, s.start, prefetch=types)
+            
+            thread = threading.Thread(target=s.start, kwargs={'prefetch': [A]})
+            thread.setDaemon(True)
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.isAlive())
+        finally:
+            event.set()
+            pool.shutdown()
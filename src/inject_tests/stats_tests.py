@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from inject.exc import FactoryTimeout
+from inject.injectors import Injector
+from inject.stats import InjectorStats
+
+
+class InjectorStatsTestCase(unittest.TestCase):
+    
+    def testCounters(self):
+        stats = InjectorStats()
+        stats.resolved('a')
+        stats.resolved('a')
+        stats.constructed('a', 0.5)
+        stats.constructed('b', 0.25)
+        
+        self.assertEqual(stats.get('a'), {'resolutions': 2,
+            'constructions': 1, 'construction_time': 0.5, 'timeouts': 0})
+        self.assertEqual(stats.get('c'), {'resolutions': 0,
+            'constructions': 0, 'construction_time': 0.0, 'timeouts': 0})
+        self.assertEqual(set(stats.types()), set(['a', 'b']))
+        
+        stats.clear()
+        self.assertEqual(stats.types(), [])
+    
+    def testInjectorStats(self):
+        '''Injector with stats=True should count resolutions
+        and constructions.
+        '''
+        class A(object): pass
+        class B(object): pass
+        
+        injector = Injector(stats=True)
+        injector.bind_factory(A, A)
+        injector.get(A)
+        injector.get(A)
+        injector.get(B)
+        
+        self.assertEqual(injector.stats.get(A)['resolutions'], 2)
+        self.assertEqual(injector.stats.get(A)['constructions'], 1)
+        self.assertEqual(injector.stats.get(B)['constructions'], 1)
+    
+    def testInjectorTimeouts(self):
+        '''Injector should count factory timeouts even without stats.'''
+        event = threading.Event()
+        
+        injector = Injector()
+        injector.bind_factory('key', event.wait, timeout=0.01)
+        self.assertRaises(FactoryTimeout, injector.get, 'key')
+        event.set()
+        
+        self.assertEqual(injector.stats.get('key')['timeouts'], 1)
+        self.assertEqual(injector.stats.types(), ['key'])
+    
+    def testNoStats(self):
+        class A(object): pass
+        
+        injector = Injector()
+        injector.get(A)
+        self.assertEqual(injector.stats.types(), [])
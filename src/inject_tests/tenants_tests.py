@@ -0,0 +1,78 @@
+import time
+import unittest
+
+from inject.injectors import Injector
+from inject.tenants import TenantInjectors
+
+
+class Pool(object):
+    
+    closed = False
+    
+    def close(self):
+        self.closed = True
+
+
+class TenantInjectorsTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = Injector()
+        self.injector.bind('shared', 'value')
+    
+    def create(self, tenant):
+        child = self.injector.child()
+        child.bind('tenant', tenant)
+        child.bind_factory(Pool, Pool)
+        return child
+    
+    def testGet(self):
+        tenants = TenantInjectors(self.create)
+        
+        a = tenants.get('a')
+        self.assertTrue(tenants.get('a') is a)
+        self.assertEqual(a.get('tenant'), 'a')
+        self.assertEqual(a.get('shared'), 'value')
+        self.assertEqual(tenants.get('b').get('tenant'), 'b')
+        self.assertEqual(set(tenants.tenants()), set(['a', 'b']))
+    
+    def testSize(self):
+        '''TenantInjectors should evict the least recently used injectors.'''
+        tenants = TenantInjectors(self.create, size=2)
+        pool = tenants.get('a').get(Pool)
+        tenants.get('b')
+        tenants.get('a')
+        tenants.get('c')
+        
+        self.assertEqual(len(tenants), 2)
+        self.assertTrue('a' in tenants)
+        self.assertFalse('b' in tenants)
+        
+        tenants.get('d')
+        self.assertFalse('a' in tenants)
+        self.assertTrue(pool.closed)
+    
+    def testIdle(self):
+        tenants = TenantInjectors(self.create, idle=0.01)
+        pool = tenants.get('a').get(Pool)
+        
+        time.sleep(0.02)
+        tenants.get('b')
+        self.assertEqual(tenants.tenants(), ['b'])
+        self.assertTrue(pool.closed)
+        
+        time.sleep(0.02)
+        tenants.evict_idle()
+        self.assertEqual(len(tenants), 0)
+    
+    def testEvict(self):
+        tenants = TenantInjectors(self.create)
+        pool = tenants.get('a').get(Pool)
+        pool2 = tenants.get('b').get(Pool)
+        
+        tenants.evict('a')
+        self.assertTrue(pool.closed)
+        self.assertFalse('a' in tenants)
+        
+        tenants.clear()
+        self.assertTrue(pool2.closed)
+        self.assertEqual(len(tenants), 0)
@@ -0,0 +1,150 @@
+import unittest
+
+import inject
+from inject.scopes import ApplicationScope, NoScope, ThreadScope, \
+    RequestScope
+from inject.testing import Journal, Snapshot
+
+
+class A(object):
+    
+    pass
+
+
+class JournalTestCase(unittest.TestCase):
+    
+    def testRollback(self):
+        scope = ApplicationScope()
+        scope.bind('a', 'value')
+        scope.journal = journal = Journal()
+        
+        scope.bind('a', 'changed')
+        scope.bind('a', 'changed2')
+        scope.bind_factory(A, A)
+        scope.bind('b', 'value')
+        scope.unbind('b')
+        self.assertEqual(len(journal.order), 3)
+        self.assertEqual(journal.get_changed(), [(scope, 'a'), (scope, A)])
+        
+        scope.journal = None
+        self.assertEqual(journal.rollback(), [(scope, 'a'), (scope, A)])
+        self.assertEqual(scope.get('a'), 'value')
+        self.assertFalse(scope.is_factory_bound(A))
+    
+    def testFactoryInstances(self):
+        '''Journal should not record instances created by factories.'''
+        scope = ApplicationScope()
+        scope.bind_factory(A, A)
+        scope.journal = journal = Journal()
+        
+        scope.get(A)
+        self.assertEqual(journal.order, [])
+
+
+class SnapshotTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.injector = inject.create()
+        self.injector.bind('a', 'value')
+        self.injector.bind_factory(A, A)
+    
+    def tearDown(self):
+        inject.unregister()
+    
+    def testRestore(self):
+        injector = self.injector
+        a = injector.get(A)
+        snapshot = Snapshot()
+        
+        injector.bind('a', 'changed')
+        injector.bind('b', 'value')
+        injector.get(ThreadScope).bind('c', 'value')
+        injector.get('d', none=True)
+        injector.bind('d', 'value')
+        
+        changes = snapshot.restore()
+        self.assertEqual(set(changes), set(["'a'", "'b'", "'d'"]))
+        self.assertEqual(injector.get('a'), 'value')
+        self.assertFalse(injector.is_bound('b'))
+        self.assertFalse(injector.is_bound('c'))
+        self.assertTrue(injector.get('d', none=True) is None)
+        self.assertTrue(injector.get(A) is a)
+        self.assertEqual(injector.get_scopes()[0].journal, None)
+    
+    def testNoChanges(self):
+        class B(object): pass
+        
+        snapshot = Snapshot()
+        self.injector.get(A)
+        self.injector.get(B)
+        self.injector.get(ApplicationScope)
+        self.assertEqual(snapshot.restore(), [])
+    
+    def testRestoreRequest(self):
+        snapshot = Snapshot()
+        scope = self.injector.get(RequestScope)
+        scope.start()
+        scope.bind('a', 'request')
+        
+        self.assertEqual(snapshot.restore(), [])
+        self.assertRaises(inject.exc.NoRequestError, scope.get, 'a')
+    
+    def testRestoreScopes(self):
+        injector = self.injector
+        scopes = injector.get_scopes()
+        snapshot = Snapshot()
+        
+        injector.bind_scope(NoScope, NoScope())
+        injector.unbind_scope(RequestScope)
+        
+        changes = snapshot.restore()
+        self.assertTrue('scopes' in changes)
+        self.assertEqual(injector.get_scopes(), scopes)
+        self.assertFalse(injector.is_bound(NoScope))
+        self.assertTrue(injector.get(RequestScope) is scopes[2])
+    
+    def testRestoreRegistration(self):
+        snapshot = Snapshot()
+        inject.unregister()
+        inject.create()
+        
+        self.assertEqual(snapshot.restore(), ['registered injector'])
+        self.assertTrue(inject.get_injector() is self.injector)
+    
+    def testRestoreTransaction(self):
+        scope = self.injector.get(ApplicationScope)
+        snapshot = Snapshot()
+        self.injector.bind_many({'a': 'changed'})
+        
+        self.assertEqual(snapshot.restore(), ['scopes'])
+        self.assertTrue(self.injector.get(ApplicationScope) is scope)
+        self.assertEqual(self.injector.get('a'), 'value')
+        
+        self.injector.bind('b', 'value')
+        self.assertTrue(scope.is_bound('b'))
+
+
+class LazySnapshotTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.configs = []
+        inject.create_lazy(self.config)
+    
+    def tearDown(self):
+        inject.unregister()
+    
+    def config(self, injector):
+        self.configs.append(injector)
+        injector.bind('a', 'value')
+    
+    def testRestore(self):
+        '''Snapshot should configure a lazy injector only once.'''
+        for i in range(3):
+            snapshot = Snapshot()
+            inject.get_injector().bind('a', 'changed')
+            self.assertEqual(inject.get_instance('a'), 'changed')
+            self.assertEqual(snapshot.restore(), ["'a'"])
+        
+        self.assertEqual(len(self.configs), 1)
+        self.assertTrue(inject.get_injector() is self.configs[0])
+        self.assertEqual(inject.get_instance('a'), 'value')
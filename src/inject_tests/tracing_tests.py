@@ -0,0 +1,73 @@
+import unittest
+from StringIO import StringIO
+
+from inject.injectors import Injector
+from inject.tracing import SamplingTracer
+
+
+class A(object):
+    
+    pass
+
+
+class SamplingTracerTestCase(unittest.TestCase):
+    
+    def testShouldSample(self):
+        tracer = SamplingTracer(every=3)
+        samples = [tracer.should_sample() for i in range(6)]
+        self.assertEqual(samples, [False, False, True] * 2)
+    
+    def testTrace(self):
+        '''SamplingTracer should record one in N resolutions.'''
+        injector = Injector()
+        injector.bind_factory(A, A)
+        injector.tracer = SamplingTracer(every=2)
+        
+        for i in range(4):
+            injector.get(A)
+        injector.get('b', none=True)
+        injector.get('b', none=True)
+        
+        samples = injector.tracer.dump()
+        self.assertEqual(len(samples), 3)
+        
+        sample = samples[0]
+        self.assertEqual(sample['type'], A)
+        self.assertEqual(sample['scope'], 'ApplicationScope')
+        self.assertEqual(sample['created'], None)
+        self.assertTrue(sample['latency'] >= 0)
+        self.assertTrue('testTrace' in sample['caller'])
+        
+        self.assertEqual(samples[2]['type'], 'b')
+        self.assertEqual(samples[2]['scope'], None)
+    
+    def testTraceCreated(self):
+        class B(object): pass
+        injector = Injector()
+        injector.bind_factory(A, A)
+        injector.tracer = SamplingTracer(every=1)
+        
+        injector.get(A)
+        injector.get(B)
+        
+        samples = injector.tracer.dump()
+        self.assertEqual(samples[0]['created'], 'factory')
+        self.assertEqual(samples[1]['created'], 'autobind')
+        self.assertEqual(len(samples), 2)
+    
+    def testRingBuffer(self):
+        injector = Injector()
+        injector.tracer = SamplingTracer(every=1, size=2)
+        for i in range(5):
+            injector.get(A)
+        
+        self.assertEqual(len(injector.tracer.dump()), 2)
+    
+    def testWrite(self):
+        injector = Injector()
+        injector.tracer = SamplingTracer(every=1)
+        injector.get(A)
+        
+        f = StringIO()
+        injector.tracer.write(f)
+        self.assertEqual(len(f.getvalue().splitlines()), 2)